@@ -6,9 +6,15 @@ Provides the base API calls for scrapbook
 """
 import os
 
+from functools import partial
+
 # We lean on papermill's readers to connect to remote stores
 from papermill.iorw import list_notebook_files
 
+from six import string_types
+
+from .blobs import BlobStore, select_store
+from .cache import ScrapCache
 from .models import Notebook, Scrapbook
 from .scraps import Scrap, scrap_to_payload
 from .schemas import GLUE_PAYLOAD_FMT
@@ -17,7 +23,7 @@ from .utils import kernel_required
 
 
 @kernel_required
-def glue(name, data, encoder=None, display=None):
+def glue(name, data, encoder=None, display=None, encoder_options=None, store=None):
     """
     Records a data value in the given notebook cell.
 
@@ -60,6 +66,14 @@ def glue(name, data, encoder=None, display=None):
         The name of the handler to use in persisting data in the notebook.
     display: any (optional)
         An indicator for persisting controlling displays for the named record.
+    encoder_options: dict (optional)
+        Options passed to the encoder for this scrap, taking precedence over
+        those set with `registry.configure` (e.g. `{"compression": "zstd"}`).
+    store: BlobStore or str (optional)
+        A `BlobStore`, or the directory of one, to write the encoded data to
+        instead of the notebook. The notebook then only holds a reference to it.
+        By default large scraps are stored according to `blobs.set_offload`,
+        which setting `store=False` disables.
     """
     # Keep slow import lazy
     import IPython
@@ -82,9 +96,13 @@ def glue(name, data, encoder=None, display=None):
 
     # Only store data that can be stored (purely display scraps can skip)
     if encoder != "display":
-        ipy_data, metadata = _prepare_ipy_data_format(
-            name, scrap_to_payload(encoder_registry.encode(Scrap(name, data, encoder))), encoder
-        )
+        scrap = encoder_registry.encode(Scrap(name, data, encoder), **(encoder_options or {}))
+        store = select_store(scrap, store)
+        if store is not None:
+            if isinstance(store, string_types):
+                store = BlobStore(store)
+            scrap = store.offload(scrap, getattr(encoder_registry[encoder], "BINARY", False))
+        ipy_data, metadata = _prepare_ipy_data_format(name, scrap_to_payload(scrap), encoder)
         ip_display(ipy_data, metadata=metadata, raw=True)
 
     # Only display data that is marked for display
@@ -112,7 +130,16 @@ def _prepare_ipy_display_format(name, payload, metadata):
     return payload, metadata
 
 
-def read_notebook(path):
+def read_notebook(
+    path,
+    streaming=False,
+    trusted=False,
+    cache=None,
+    scraps=None,
+    validate=True,
+    as_arrow=False,
+    blob_roots=None,
+):
     """
     Returns a Notebook object loaded from the location specified at `path`.
 
@@ -120,6 +147,31 @@ def read_notebook(path):
     ----------
     path : str
         Path to a notebook `.ipynb` file.
+    streaming : bool (default: False)
+        Stream the notebook and only keep the outputs which hold scraps. This
+        bounds memory use on notebooks with large non-scrap outputs, at the cost
+        of not having the full notebook content available and of parsing the
+        notebook twice (see `readers.read_scrap_node`). Requires `ijson`.
+    trusted : bool (default: False)
+        Only validate the envelope (name, encoder, version) of scrap payloads
+        rather than their full schema. Use for notebooks from trusted sources.
+    cache : ScrapCache or str (optional)
+        A `ScrapCache`, or a local directory to keep one in, which serves repeat
+        reads of unchanged notebooks without fetching or parsing them again.
+        Notebooks served from the cache only hold their scrap outputs.
+    scraps : str or iterable[str] (optional)
+        Names of the only scraps to extract. All other scrap payloads are
+        skipped without being validated or decoded.
+    validate : bool (default: True)
+        Validate the notebook against nbformat's schema. Skipping validation
+        saves time on large notebooks when only scraps are of interest.
+    as_arrow : bool (default: False)
+        Decode Arrow backed scraps, such as "pandas" and "arrow" encoded
+        dataframes, to `pyarrow.Table` objects instead of their glued type.
+    blob_roots : str or iterable[str] (optional)
+        Local directories, besides the notebook's own, which scraps stored in a
+        `BlobStore` may be read from without `trusted`, such as the store of a
+        kernel which ran in another directory than the notebook was written to.
 
     Returns
     -------
@@ -127,10 +179,45 @@ def read_notebook(path):
         A Notebook object.
 
     """
-    return Notebook(path)
+    if isinstance(scraps, string_types):
+        scraps = [scraps]
+    if isinstance(blob_roots, string_types):
+        blob_roots = [blob_roots]
+    options = dict(
+        streaming=streaming,
+        trusted=trusted,
+        scraps=scraps,
+        validate=validate,
+        as_arrow=as_arrow,
+        blob_roots=None if blob_roots is None else [os.path.abspath(root) for root in blob_roots],
+    )
+    if cache is None:
+        return Notebook(path, **options)
+    if isinstance(cache, string_types):
+        cache = ScrapCache(cache)
+    return cache.read_notebook(path, **options)
+
+
+def _load_notebook(path, decode=False, **kwargs):
+    notebook = read_notebook(path, **kwargs)
+    if decode:
+        for scrap in notebook.scraps.values():
+            scrap.data
+    return notebook
 
 
-def read_notebooks(path, path_filter=None):
+def read_notebooks(
+    path,
+    path_filter=None,
+    workers=None,
+    executor="thread",
+    decode=False,
+    lazy=False,
+    max_loaded=None,
+    previous=None,
+    where=None,
+    **kwargs
+):
     """
     Returns a Scrapbook including the notebooks read from the
     directory specified by `path`.
@@ -142,6 +229,28 @@ def read_notebooks(path, path_filter=None):
     path_filter: Optional[Callable[str, bool]]
         Func used to filter the notebook by its filename:
         should return True if you want to read that notebook and False otherwise
+    workers: Optional[int]
+        Number of notebooks to fetch and parse concurrently. Notebooks are
+        read one at a time by default.
+    executor: str (default: "thread")
+        Either "thread" or "process" to choose the pool the workers run in.
+    decode: bool (default: False)
+        Decode every scrap while reading, which moves decoding into the workers
+        instead of deferring it to the first access of each scrap.
+    lazy: bool (default: False)
+        Only list the notebooks, loading each one on first access instead.
+    max_loaded: Optional[int]
+        For lazy reads, the number of notebooks kept loaded at once. The least
+        recently accessed notebooks are released beyond that.
+    previous: Optional[Scrapbook]
+        A Scrapbook previously read from `path`. Only notebooks which are new or
+        changed since then are read, the others are reused as is.
+    where: Optional[Union[dict, Callable[dict, bool]]]
+        Parameter values notebooks must have to be read, or a predicate called
+        with each notebook's parameters. Only the notebook metadata is read to
+        check them, and full reads only happen for matching notebooks.
+    kwargs:
+        Options passed along to `read_notebook` for each notebook.
 
     Returns
     -------
@@ -149,8 +258,11 @@ def read_notebooks(path, path_filter=None):
         A `Scrapbook` object.
 
     """
-    scrapbook = Scrapbook()
-    for notebook_path in sorted(filter(path_filter, list_notebook_files(path))):
-        fn = os.path.splitext(os.path.basename(notebook_path))[0]
-        scrapbook[fn] = read_notebook(notebook_path)
+    notebook_paths = sorted(filter(path_filter, list_notebook_files(path)))
+    reader = partial(_load_notebook, decode=decode, **kwargs)
+    scrapbook = Scrapbook(lazy=lazy, max_loaded=max_loaded, reader=reader)
+    if previous is not None:
+        scrapbook._inherit(previous)
+    scrapbook._listing = (path, path_filter, where, workers, executor)
+    scrapbook._read_listing(notebook_paths)
     return scrapbook
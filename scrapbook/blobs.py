@@ -0,0 +1,276 @@
+# -*- coding: utf-8 -*-
+"""
+blobs.py
+
+Provides storage of scrap data outside of notebooks, referenced from payloads
+"""
+import os
+import json
+import mmap
+import hashlib
+import tempfile
+import warnings
+
+from .utils import json_loads, b64decode_chunked
+from .readers import is_local_path
+from .exceptions import ScrapbookDataException
+
+DEFAULT_BLOB_DIRECTORY = "scrapbook_blobs"
+BLOB_EXT = ".blob"
+
+
+def _env_size(name):
+    value = os.environ.get(name)
+    return int(value) if value else None
+
+
+# Encoded scraps over `offload_threshold` bytes are written to a BlobStore in
+# `offload_directory` by `glue`, and ones over `payload_budget` bytes warn. Both
+# are disabled unless set with `set_offload` or through environment variables.
+offload_threshold = _env_size("SCRAPBOOK_OFFLOAD_THRESHOLD")
+offload_directory = os.environ.get("SCRAPBOOK_OFFLOAD_DIRECTORY", DEFAULT_BLOB_DIRECTORY)
+payload_budget = _env_size("SCRAPBOOK_PAYLOAD_BUDGET")
+
+
+class BlobRef(dict):
+    """
+    The `ref` of a scrap payload, pointing at scrap data stored outside of the
+    notebook. Holds the blob's `path`, `size` and `sha256` digest, and a `format`
+    of "json" when the blob holds JSON rather than an encoder's binary payload.
+
+    Relative paths are resolved against `base`, the directory of the notebook the
+    reference was read from, or else against the `root` directory recorded by the
+    `BlobStore` when the blob isn't found there (e.g. for notebooks written to
+    another directory than the kernel's). References come from the notebook, so
+    scraps read without `trusted` only follow paths within the notebook's
+    directory or the reader's allowed `roots` (see `check_location`) and verify
+    the blob's sha256 digest.
+    """
+
+    def __init__(self, ref, base=None, roots=None):
+        super(BlobRef, self).__init__(ref)
+        self.base = base
+        self.roots = list(roots or [])
+
+    def _relative_location(self):
+        path = self["path"]
+        if self.base is None or os.path.isabs(path) or "://" in path:
+            return path
+        if is_local_path(self.base):
+            return os.path.join(self.base, path)
+        return self.base.rstrip("/") + "/" + path
+
+    @property
+    def location(self):
+        """str: the path or url the blob is read from"""
+        path, location, root = self["path"], self._relative_location(), self.get("root")
+        relative = not (os.path.isabs(path) or "://" in path)
+        if root and relative and is_local_path(location) and not os.path.exists(location):
+            # Written relative to a kernel running outside of the notebook's directory
+            return os.path.join(root, path)
+        return location
+
+    def resolved(self):
+        """
+        Returns a reference to the same blob which doesn't depend on the notebook
+        it was read from, with the blob's location as its path
+        """
+        location = self.location
+        if is_local_path(location):
+            location = os.path.abspath(location)
+        ref = {key: value for key, value in self.items() if key != "root"}
+        ref["path"] = location
+        return BlobRef(ref, roots=self.roots)
+
+    def check_location(self):
+        """
+        Raises a ScrapbookDataException unless the reference is a relative path
+        which stays within its base directory, or a local path within the
+        notebook's directory or one of the allowed `roots`, so an untrusted
+        notebook can't point readers at arbitrary local files or urls.
+        """
+        path, location = self["path"], self.location
+        normalized = os.path.normpath(path.replace("\\", "/"))
+        escapes = normalized == os.pardir or normalized.startswith(os.pardir + os.sep)
+        relative = not (os.path.isabs(path) or "://" in path or escapes)
+        if relative and location == self._relative_location():
+            return
+        allowed = list(self.roots)
+        if self.base is not None and is_local_path(self.base):
+            allowed.append(self.base or os.curdir)
+        if is_local_path(location) and any(_within(location, root) for root in allowed):
+            return
+        raise ScrapbookDataException(
+            "Blob path '{}' is outside of the notebook's directory and the allowed "
+            "`blob_roots`. Read the notebook with `trusted=True` or `blob_roots` "
+            "to follow it".format(location)
+        )
+
+    def load(self, verify=False):
+        """
+        Reads the referenced blob. Local blobs are memory mapped rather than read
+        into memory. Blobs holding JSON are returned parsed.
+
+        Parameters
+        ----------
+        verify : bool (default: False)
+            Check the blob content against the reference's sha256 digest. The
+            size of blobs is always checked.
+        """
+        location = self.location
+        if is_local_path(location):
+            with open(location, "rb") as f:
+                content = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if self["size"] else b""
+        else:
+            content = _read_remote(location)
+        if len(content) != self["size"]:
+            raise ScrapbookDataException(
+                "Blob '{}' holds {} bytes, expected {}".format(location, len(content), self["size"])
+            )
+        if verify and hashlib.sha256(content).hexdigest() != self["sha256"]:
+            raise ScrapbookDataException("Blob '{}' does not match its sha256 digest".format(location))
+        if self.get("format") == "json":
+            return json_loads(bytes(content))
+        return content
+
+
+def _within(path, directory):
+    """Returns True if local `path` is within `directory`, once links are resolved"""
+    path, directory = os.path.realpath(path), os.path.realpath(directory)
+    try:
+        return os.path.commonpath([path, directory]) == directory
+    except ValueError:
+        # Paths on different drives
+        return False
+
+
+def _read_remote(location):
+    try:
+        # Keep optional import lazy
+        import fsspec
+    except ImportError:
+        raise ImportError(
+            "Reading blobs from remote stores requires fsspec. "
+            "Please install fsspec to read '{}'".format(location)
+        )
+    with fsspec.open(location, "rb") as f:
+        return f.read()
+
+
+class BlobStore(object):
+    """
+    A content addressed directory of scrap data, written to by `glue` to keep
+    large scraps out of notebooks. Blobs are named after the sha256 digest of
+    their content, so identical data is only stored once.
+
+    Relative directories are resolved against the kernel's working directory,
+    which is normally the notebook's directory. Their paths are recorded as is,
+    for the reader to resolve against the directory of the notebook, along with
+    the working directory as the `root` to fall back on when the notebook was
+    written elsewhere.
+
+    Parameters
+    ----------
+    directory : str (default: "scrapbook_blobs")
+        Directory to store blobs in. Created if missing.
+    """
+
+    def __init__(self, directory=DEFAULT_BLOB_DIRECTORY):
+        self.directory = directory
+
+    def put(self, content, format=None):
+        """
+        Stores `content` bytes, returning a `BlobRef` to them.
+        """
+        digest = hashlib.sha256(content).hexdigest()
+        path = os.path.join(self.directory, digest + BLOB_EXT)
+        if not os.path.exists(path):
+            if not os.path.isdir(self.directory):
+                os.makedirs(self.directory)
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(content)
+                os.replace(tmp_path, path)
+            except Exception:
+                os.remove(tmp_path)
+                raise
+        ref = {"path": path, "size": len(content), "sha256": digest}
+        if not os.path.isabs(path):
+            ref["root"] = os.getcwd()
+        if format:
+            ref["format"] = format
+        return BlobRef(ref)
+
+    def offload(self, scrap, binary=False):
+        """
+        Returns the encoded `scrap` with its data moved into the store. Binary
+        payloads (the base64 strings of encoders like "pandas" or "arrow") are
+        stored as raw bytes, other payloads as JSON.
+        """
+        if binary:
+            return scrap._replace(data=self.put(b64decode_chunked(scrap.data)))
+        return scrap._replace(data=self.put(json.dumps(scrap.data).encode("utf-8"), "json"))
+
+
+def set_offload(threshold=None, directory=DEFAULT_BLOB_DIRECTORY, budget=None):
+    """
+    Configures how `glue` handles large scraps for the rest of the session.
+
+    Parameters
+    ----------
+    threshold : int (optional)
+        Encoded size in bytes above which scraps are written to a `BlobStore`
+        rather than the notebook. Offloading is disabled when None.
+    directory : str (default: "scrapbook_blobs")
+        Directory of the `BlobStore` scraps are offloaded to.
+    budget : int (optional)
+        Encoded size in bytes above which a warning is emitted for a scrap,
+        whether it is offloaded or not. Disabled when None.
+    """
+    global offload_threshold, offload_directory, payload_budget
+    offload_threshold, offload_directory, payload_budget = threshold, directory, budget
+
+
+def encoded_size(data):
+    """Returns the size in bytes of encoded scrap data as stored in a notebook"""
+    if isinstance(data, BlobRef):
+        return data["size"]
+    if isinstance(data, str):
+        return len(data.encode("utf-8"))
+    return len(json.dumps(data).encode("utf-8"))
+
+
+def scrap_size(scrap):
+    """
+    Returns the encoded size in bytes of an encoded `scrap`, reusing the size
+    recorded in the summary of JSON scraps rather than encoding them again
+    """
+    summary = (scrap.metadata or {}).get("summary") or {}
+    if scrap.encoder == "json" and "nbytes" in summary:
+        return summary["nbytes"]
+    return encoded_size(scrap.data)
+
+
+def select_store(scrap, store=None):
+    """
+    Returns the store `glue` writes the encoded `scrap` to, if any. An explicit
+    `store` is used as is, else the configured offload threshold applies (a
+    `store` of False disables offloading). Warns when the scrap is over the
+    configured payload budget.
+    """
+    size = None
+    if payload_budget is not None:
+        size = scrap_size(scrap)
+        if size > payload_budget:
+            warnings.warn(
+                "Scrap '{}' is {} bytes encoded, over the payload budget of {} bytes".format(
+                    scrap.name, size, payload_budget
+                )
+            )
+    if store is not None:
+        return store or None
+    if offload_threshold is None:
+        return None
+    size = scrap_size(scrap) if size is None else size
+    return BlobStore(offload_directory) if size > offload_threshold else None
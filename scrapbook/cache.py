@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+"""
+cache.py
+
+Provides a local on-disk cache of the scraps extracted from notebooks
+"""
+import os
+import json
+import pickle
+import hashlib
+import tempfile
+
+from .log import logger
+from .models import Notebook
+from .readers import notebook_identity, reads_node, slim_node
+
+# Bump whenever the layout of cached entries changes
+CACHE_FORMAT_VERSION = 2
+CACHE_ENTRY_EXT = ".scraps"
+
+
+class ScrapCache(object):
+    """
+    A local directory of the scraps extracted from notebooks, keyed on each
+    notebook's identity (see `readers.notebook_identity`) and read options. A
+    repeat read of an unchanged notebook is served from the cache without
+    fetching, parsing or validating it again.
+
+    Entries hold the notebook metadata, cell execution details and scrap outputs
+    together with the notebook's scraps. Entries are pickled, so only point the
+    cache at directories you trust.
+
+    Parameters
+    ----------
+    directory : str
+        Local directory to store cache entries in. Created if missing.
+    max_size : int (default: 1GiB)
+        Size in bytes the cache is trimmed down to, evicting the least recently
+        used entries first.
+    decode : bool (default: False)
+        Decode every scrap before storing an entry, so later reads skip decoding
+        as well at the cost of larger entries.
+    """
+
+    def __init__(self, directory, max_size=2 ** 30, decode=False):
+        self.directory = os.path.expanduser(directory)
+        self.max_size = max_size
+        self.decode = decode
+        # Running total of the entries' size, scanned on the first store. Entries
+        # written by other processes aren't counted, but eviction rescans.
+        self._size = None
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+
+    def _entry_path(self, identity, options):
+        key = json.dumps([CACHE_FORMAT_VERSION, identity, sorted(options.items())])
+        return os.path.join(
+            self.directory, hashlib.sha256(key.encode("utf-8")).hexdigest() + CACHE_ENTRY_EXT
+        )
+
+    def _entries(self):
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(CACHE_ENTRY_EXT):
+                yield entry
+
+    def _stats(self):
+        """Yields the (stat, path) of each entry, skipping ones removed concurrently"""
+        for entry in self._entries():
+            try:
+                yield entry.stat(), entry.path
+            except FileNotFoundError:
+                pass
+
+    def _load(self, entry_path):
+        try:
+            with open(entry_path, "rb") as f:
+                notebook = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning("Discarding unreadable cache entry {}: {}".format(entry_path, e))
+            self._remove(entry_path)
+            return None
+        # Mark the entry as recently used for eviction
+        try:
+            os.utime(entry_path, None)
+        except FileNotFoundError:
+            # Evicted by another reader since it was loaded
+            pass
+        return notebook
+
+    def _store(self, entry_path, notebook):
+        scraps = notebook.scraps
+        if self.decode:
+            for scrap in scraps.values():
+                scrap.data
+        cached = Notebook(
+            slim_node(notebook.node),
+            trusted=notebook.trusted,
+            scraps=notebook.scrap_names,
+            as_arrow=notebook.as_arrow,
+            blob_roots=notebook.blob_roots,
+        )
+        cached.path = notebook.path
+        cached._scraps = scraps
+
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(cached, f, protocol=pickle.HIGHEST_PROTOCOL)
+            entry_size = os.path.getsize(tmp_path)
+            os.replace(tmp_path, entry_path)
+        except Exception:
+            self._remove(tmp_path)
+            raise
+        if self._size is None:
+            self._size = self.size
+        else:
+            self._size += entry_size
+        # Only scan the entries when the cache has outgrown its budget
+        if self._size > self.max_size:
+            self.evict()
+
+    def _remove(self, entry_path):
+        try:
+            os.remove(entry_path)
+        except FileNotFoundError:
+            pass
+
+    @property
+    def size(self):
+        """int: total size in bytes of the cache entries"""
+        return sum(stat.st_size for stat, _ in self._stats())
+
+    def evict(self, max_size=None):
+        """
+        Removes the least recently used entries until the cache fits in `max_size`
+        bytes (defaulting to the cache's `max_size`).
+        """
+        max_size = self.max_size if max_size is None else max_size
+        entries = sorted(self._stats(), key=lambda item: item[0].st_mtime)
+        total = sum(stat.st_size for stat, _ in entries)
+        for stat, entry_path in entries:
+            if total <= max_size:
+                break
+            self._remove(entry_path)
+            total -= stat.st_size
+        self._size = total
+
+    def clear(self):
+        """Removes every entry from the cache."""
+        self.evict(0)
+
+    def read_notebook(self, path, **kwargs):
+        """
+        Returns the Notebook at `path`, from the cache when an entry for the same
+        notebook identity and read options exists, else reading and storing it.
+
+        Parameters
+        ----------
+        path : str
+            Path to a notebook `.ipynb` file.
+        kwargs :
+            Options passed along to the `Notebook` constructor.
+        """
+        identity, source = notebook_identity(path)
+        entry_path = self._entry_path(identity, kwargs)
+        notebook = self._load(entry_path)
+        if notebook is not None:
+            notebook.path = path
+            return notebook
+
+        if source is None:
+            notebook = Notebook(path, **kwargs)
+        else:
+            # Reuse the remote content fetched to identify the notebook
+            node = reads_node(source, validate=kwargs.get("validate", True))
+            notebook = Notebook(node, **kwargs)
+            notebook.path = path
+        self._store(entry_path, notebook)
+        return notebook
@@ -4,16 +4,21 @@ encoders.py
 
 Provides the encoders for various data types to be persistable
 """
+import sys
 import six
 import json
-import base64
+import datetime
+import warnings
 import collections.abc
+import numpy as np
 import pandas as pd
 
 from io import BytesIO
 from json import JSONDecodeError
 from collections import OrderedDict
 
+from .log import logger
+from .utils import json_loads, b64encode_chunked, b64decode_chunked
 from .scraps import scrap_to_payload
 from .exceptions import ScrapbookException, ScrapbookInvalidEncoder, ScrapbookMissingEncoder
 
@@ -21,6 +26,8 @@ from .exceptions import ScrapbookException, ScrapbookInvalidEncoder, ScrapbookMi
 class DataEncoderRegistry(collections.abc.MutableMapping):
     def __init__(self):
         self._encoders = OrderedDict()
+        self._options = {}
+        self._dispatch = {}
 
     def __getitem__(self, key):
         return self._encoders.__getitem__(key)
@@ -35,9 +42,11 @@ class DataEncoderRegistry(collections.abc.MutableMapping):
         ):
             raise ScrapbookException("Can't register object without 'decode' method.")
 
+        self._dispatch.clear()
         return self._encoders.__setitem__(key, value)
 
     def __delitem__(self, key):
+        self._dispatch.clear()
         return self._encoders.__delitem__(key)
 
     def __iter__(self):
@@ -81,19 +90,70 @@ class DataEncoderRegistry(collections.abc.MutableMapping):
         Resets the registry to have no encoders.
         """
         self._encoders = {}
+        self._options = {}
+        self._dispatch = {}
 
-    def determine_encoder_name(self, data):
+    def configure(self, name, **options):
+        """
+        Sets default options passed to a particular encoder's `encode` calls,
+        which options given to an individual `encode` call take precedence over.
+        Call without options to clear the defaults.
+
+        Parameters
+        ----------
+        name: str
+            Name of the encoder to configure.
+        options:
+            Keyword arguments for the encoder's `encode` method.
+        """
+        if options:
+            self._options[name] = options
+        else:
+            self._options.pop(name, None)
+
+    def options(self, name):
         """
-        Determines the
+        Returns the default `encode` options configured for the named encoder.
         """
+        return dict(self._options.get(name, {}))
+
+    def _resolve_type(self, cls):
+        """
+        Returns the encoders which need probing for values of type `cls`, and the
+        encoder to fall back to once those decline. Encoders declaring the types
+        they handle through `encodable_types` are resolved from the type's MRO
+        without probing, stopping at the first one that handles the type.
+        """
+        probes = []
         for name, encoder in self._encoders.items():
+            declared = getattr(encoder, "encodable_types", None)
+            types = declared() if callable(declared) else None
+            if not isinstance(types, tuple):
+                probes.append((name, encoder))
+            elif issubclass(cls, types):
+                return probes, name
+        return probes, None
+
+    def determine_encoder_name(self, data):
+        """
+        Determines the name of the first registered encoder able to encode `data`.
+        Resolutions are cached per type until the registered encoders change.
+        """
+        cls = type(data)
+        try:
+            probes, name = self._dispatch[cls]
+        except KeyError:
+            probes, name = self._dispatch[cls] = self._resolve_type(cls)
+        for probe_name, encoder in probes:
             if encoder.encodable(data):
-                return name
+                return probe_name
+        if name is not None:
+            return name
         raise NotImplementedError(
             "Scrap of type {stype} has no supported encoder registered".format(stype=type(data))
         )
 
-    def decode(self, scrap, **kwargs):
+    def decode(self, scrap, trusted=False, **kwargs):
         """
         Finds the register for the given encoder and translates the scrap's data
         from a string or JSON type to an object of the encoder output type.
@@ -102,17 +162,24 @@ class DataEncoderRegistry(collections.abc.MutableMapping):
         ----------
         scrap: Scrap
             A partially filled in scrap with data that needs decoding
+        trusted: bool (default: False)
+            Only validate the payload envelope rather than the full schema
+        as_arrow: bool (default: False)
+            Decode to a `pyarrow.Table` when the encoder is Arrow backed (has a
+            true `ARROW_BACKED` attribute). Ignored for other encoders.
         """
         # Run validation on encoded data
-        scrap_to_payload(scrap)
+        scrap_to_payload(scrap, trusted=trusted)
         loader = self._encoders.get(scrap.encoder)
         if not loader:
             raise ScrapbookMissingEncoder(
                 'No encoder found for "{}" encoder type!'.format(scrap.encoder)
             )
+        if kwargs.pop("as_arrow", False) and getattr(loader, "ARROW_BACKED", False):
+            kwargs["as_arrow"] = True
         return loader.decode(scrap, **kwargs)
 
-    def encode(self, scrap, **kwargs):
+    def encode(self, scrap, trusted=False, summarize=True, **kwargs):
         """
         Finds the register for the given encoder and translates the scrap's data
         from an object of the encoder type to a JSON typed object.
@@ -121,37 +188,160 @@ class DataEncoderRegistry(collections.abc.MutableMapping):
         ----------
         scrap: Scrap
             A partially filled in scrap with data that needs encoding
+        trusted: bool (default: False)
+            Only validate the payload envelope rather than the full schema
+        summarize: bool (default: True)
+            Record the encoder's `summarize` output for the data, if any, as the
+            `summary` of the scrap metadata
         """
         encoder = self._encoders.get(scrap.encoder)
         if not encoder:
             raise ScrapbookMissingEncoder(
                 'No encoder found for "{data_type}" data type!'.format(data_type=encoder)
             )
-        output_scrap = encoder.encode(scrap, **kwargs)
+        output_scrap = encoder.encode(scrap, **dict(self.options(scrap.encoder), **kwargs))
+        summary = None
+        if summarize and callable(getattr(encoder, "summarize", None)):
+            try:
+                summary = encoder.summarize(scrap.data)
+                # Summaries are stored in the payload, so must serialize as JSON
+                json.dumps(summary)
+            except Exception as e:
+                # A summary is a convenience, so never fail the glue over one
+                logger.warning("Skipping the summary of scrap '%s': %s", scrap.name, e)
+                summary = None
+        if isinstance(summary, dict):
+            output_scrap = output_scrap._replace(
+                metadata=dict(output_scrap.metadata or {}, summary=summary)
+            )
         # Run validation on encoded data
-        scrap_to_payload(output_scrap)
+        scrap_to_payload(output_scrap, trusted=trusted)
         return output_scrap
 
 
+def payload_bytes(data):
+    """
+    Returns the bytes of a binary payload, which is either a base64 string as
+    stored in notebooks or a bytes-like object read from an external blob.
+    """
+    if isinstance(data, six.string_types):
+        return b64decode_chunked(data)
+    return data
+
+
+def record_options(scrap, options):
+    """
+    Returns the scrap with the given encoding options recorded in its metadata,
+    so readers can tell how the payload was written. Options must be JSON types.
+    """
+    if not options:
+        return scrap
+    return scrap._replace(metadata=dict(scrap.metadata or {}, options=options))
+
+
+def _json_scalar(value):
+    """
+    Converts a numpy, pandas or arrow scalar to a JSON type for summaries.
+    Missing values (NaN, NaT and NA) become None, datetimes and durations become
+    ISO 8601 strings, and values without a JSON type become None.
+    """
+    if value is None or (np.ndim(value) == 0 and pd.isna(value)):
+        return None
+    if isinstance(value, (datetime.timedelta, np.timedelta64)):
+        return pd.Timedelta(value).isoformat()
+    # Timestamps, datetimes and dates
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    if isinstance(value, np.datetime64):
+        return str(value)
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, bool) or isinstance(value, (int, float, six.string_types)):
+        return value
+    return None
+
+
+def _has_range(dtype):
+    """Returns True for the real integer, float and datetime dtypes summaries record min/max of"""
+    types = pd.api.types
+    checks = (types.is_integer_dtype, types.is_float_dtype, types.is_datetime64_any_dtype)
+    return any(check(dtype) for check in checks)
+
+
+def summarize_dataframe(df):
+    """
+    Returns a summary of a pandas DataFrame: its row count, in memory size and
+    the name, dtype, null count and (for numeric or datetime columns) min and
+    max of each column.
+    """
+    columns = []
+    for name, series in df.items():
+        column = {"name": str(name), "type": str(series.dtype), "nulls": int(series.isna().sum())}
+        if _has_range(series.dtype):
+            column["min"], column["max"] = _json_scalar(series.min()), _json_scalar(series.max())
+        columns.append(column)
+    return {
+        "type": "dataframe",
+        "rows": len(df),
+        "nbytes": int(df.memory_usage(index=True).sum()),
+        "columns": columns,
+    }
+
+
+def summarize_table(table, type_name="table"):
+    """
+    Returns a summary of a `pyarrow.Table` or `RecordBatch`, like that of
+    `summarize_dataframe` but with arrow types.
+    """
+    # Keep slow import lazy
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    # Only real numbers and dates, as min_max doesn't support durations
+    checks = (pa.types.is_integer, pa.types.is_floating, pa.types.is_timestamp, pa.types.is_date)
+    columns = []
+    for field, values in zip(table.schema, table.columns):
+        column = {"name": field.name, "type": str(field.type), "nulls": values.null_count}
+        if any(check(field.type) for check in checks):
+            min_max = pc.min_max(values)
+            column["min"] = _json_scalar(min_max["min"].as_py())
+            column["max"] = _json_scalar(min_max["max"].as_py())
+        columns.append(column)
+    return {"type": type_name, "rows": table.num_rows, "nbytes": table.nbytes, "columns": columns}
+
+
 class JsonEncoder(object):
     ENCODER_NAME = 'json'
+    # Only JSON lists and dicts with more items than this get a summary, so
+    # small values are never serialized just to measure them
+    SUMMARY_THRESHOLD = 2 ** 12
 
     def name(self):
         return self.ENCODER_NAME
 
+    def encodable_types(self):
+        return (list, dict, int, float, bool, str)
+
     def encodable(self, data):
-        return isinstance(data, (list, dict, int, float, bool, str))
+        return isinstance(data, self.encodable_types())
 
     def encode(self, scrap, **kwargs):
         if isinstance(scrap.data, six.string_types):
             scrap = scrap._replace(data=json.loads(scrap.data))
         return scrap
 
+    def summarize(self, data):
+        if not isinstance(data, (list, dict)) or len(data) <= self.SUMMARY_THRESHOLD:
+            return None
+        # The encoded size, which `blobs.select_store` reuses rather than encoding again
+        nbytes = len(json.dumps(data).encode("utf-8"))
+        return {"type": type(data).__name__, "length": len(data), "nbytes": nbytes}
+
     def decode(self, scrap, **kwargs):
         # Just in case we somehow got a valid JSON string pushed
         try:
             if isinstance(scrap.data, six.string_types):
-                scrap = scrap._replace(data=json.loads(scrap.data))
+                scrap = scrap._replace(data=json_loads(scrap.data))
         except JSONDecodeError:
             # The string is an actual string and not a json string, so don't modify
             pass
@@ -164,8 +354,11 @@ class TextEncoder(object):
     def name(self):
         return self.ENCODER_NAME
 
+    def encodable_types(self):
+        return (str,)
+
     def encodable(self, data):
-        return isinstance(data, str)
+        return isinstance(data, self.encodable_types())
 
     def encode(self, scrap, **kwargs):
         if not isinstance(scrap.data, six.string_types):
@@ -187,10 +380,13 @@ class DisplayEncoder(object):
     def name(self):
         return self.ENCODER_NAME
 
-    def encodable(self, data):
+    def encodable_types(self):
         from IPython.display import DisplayObject
 
-        return isinstance(data, DisplayObject)
+        return (DisplayObject,)
+
+    def encodable(self, data):
+        return isinstance(data, self.encodable_types())
 
     def encode(self, scrap, **kwargs):
         raise NotImplementedError("This code path should not be reached")
@@ -201,23 +397,296 @@ class DisplayEncoder(object):
 
 class PandasArrowDataframeEncoder(object):
     ENCODER_NAME = 'pandas'
+    # Encodes to base64 strings of binary data
+    BINARY = True
+    # Can decode to pyarrow.Table objects
+    ARROW_BACKED = True
 
     def name(self):
         return self.ENCODER_NAME
 
+    def encodable_types(self):
+        return (pd.DataFrame,)
+
     def encodable(self, data):
-        return isinstance(data, pd.DataFrame)
+        return isinstance(data, self.encodable_types())
 
     def encode(self, scrap, **kwargs):
-        scrap_bytes = BytesIO()
-        scrap.data.to_parquet(scrap_bytes, engine="pyarrow", **kwargs)
-        scrap_bytes.seek(0)
-        return scrap._replace(data=base64.b64encode(scrap_bytes.getvalue()).decode())
+        """
+        Encodes the dataframe as parquet. Options (e.g. `compression`,
+        `compression_level`, `use_dictionary`, `row_group_size` or
+        `use_byte_stream_split`) are passed along to pyarrow's parquet writer and
+        recorded in the scrap metadata.
+        """
+        with BytesIO() as scrap_bytes:
+            scrap.data.to_parquet(scrap_bytes, engine="pyarrow", **kwargs)
+            # Encode from a view of the written bytes rather than a copy of them
+            encoded = b64encode_chunked(scrap_bytes.getbuffer())
+        # The parquet bytes are released before building the payload str
+        scrap = scrap._replace(data=encoded.decode("ascii"))
+        return record_options(scrap, kwargs)
+
+    def summarize(self, data):
+        return summarize_dataframe(data)
+
+    def decode(self, scrap, as_arrow=False, head=None, **kwargs):
+        """
+        Decodes the scrap to a `pandas.DataFrame`, or a `pyarrow.Table` when
+        `as_arrow` is set. Other options (e.g. `columns` or `filters`) are passed
+        along to the parquet reader, so only the selected column chunks and the
+        row groups matching the filters are decoded. With `head`, only the first
+        `head` rows are read.
+        """
+        # Keep slow import lazy
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        # Read the parquet file in place rather than from a copy in a BytesIO
+        scrap_bytes = pa.BufferReader(payload_bytes(scrap.data))
+        if head is None and not as_arrow:
+            return scrap._replace(data=pd.read_parquet(scrap_bytes, engine="pyarrow", **kwargs))
+
+        if head is not None and kwargs.get("filters") is None:
+            table = _read_parquet_head(pq.ParquetFile(scrap_bytes), head, kwargs.get("columns"))
+        else:
+            table = pq.read_table(scrap_bytes, use_pandas_metadata=True, **kwargs)
+            if head is not None:
+                table = table.slice(0, head)
+        return scrap._replace(data=table if as_arrow else table.to_pandas())
+
+
+def _read_parquet_head(parquet_file, head, columns=None):
+    """Reads the first `head` rows of a parquet file, stopping at the row group holding them"""
+    # Keep slow import lazy
+    import pyarrow as pa
+
+    batches, rows = [], 0
+    for batch in parquet_file.iter_batches(
+        batch_size=max(head, 1), columns=columns, use_pandas_metadata=True
+    ):
+        batches.append(batch)
+        rows += batch.num_rows
+        if rows >= head:
+            break
+    if not batches:
+        return parquet_file.read(columns=columns, use_pandas_metadata=True)
+    return pa.Table.from_batches(batches).slice(0, head)
+
+
+class ArrowIpcEncoder(object):
+    """
+    Stores dataframes, `pyarrow.Table` and `pyarrow.RecordBatch` objects and,
+    when polars is installed, polars DataFrames in the Arrow IPC stream format
+    (as used by Feather v2), optionally compressing the buffers with "lz4" or
+    "zstd". Arrow and polars data is written without converting it to pandas.
+
+    Decoding reads the record batches straight from the decoded bytes without
+    copying them, which is much cheaper than parsing parquet. Scraps decode to
+    the type they were glued as, which is recorded in the scrap metadata.
+
+    Parameters
+    ----------
+    compression: str (optional)
+        Buffer compression codec, either "lz4" or "zstd". Can be overridden by
+        the `compression` option of `encode`.
+    """
+
+    ENCODER_NAME = 'arrow'
+    BINARY = True
+    ARROW_BACKED = True
+
+    def __init__(self, compression=None):
+        self.compression = compression
 
-    def decode(self, scrap, **kwargs):
-        scrap_bytes = BytesIO(base64.b64decode(scrap.data))
-        scrap_bytes.seek(0)
-        return scrap._replace(data=pd.read_parquet(scrap_bytes, engine="pyarrow", **kwargs))
+    def name(self):
+        return self.ENCODER_NAME
+
+    def encodable_types(self):
+        try:
+            import pyarrow as pa
+        except ImportError:
+            return (pd.DataFrame,)
+        types = (pd.DataFrame, pa.Table, pa.RecordBatch)
+        # Only polars data can be glued once polars is imported, so don't import it
+        polars = sys.modules.get("polars")
+        return types + (polars.DataFrame,) if polars else types
+
+    def encodable(self, data):
+        return isinstance(data, self.encodable_types())
+
+    def encode(self, scrap, compression=None, preserve_index=None, **kwargs):
+        # Keep slow import lazy
+        import pyarrow as pa
+
+        table, data_type = scrap.data, None
+        if isinstance(table, pd.DataFrame):
+            table = pa.Table.from_pandas(table, preserve_index=preserve_index)
+        elif isinstance(table, pa.RecordBatch):
+            table, data_type = pa.Table.from_batches([table]), "record_batch"
+        elif isinstance(table, pa.Table):
+            data_type = "table"
+        else:
+            table, data_type = table.to_arrow(), "polars"
+        options = pa.ipc.IpcWriteOptions(compression=compression or self.compression)
+        with pa.BufferOutputStream() as sink:
+            with pa.ipc.new_stream(sink, table.schema, options=options) as writer:
+                writer.write_table(table)
+            encoded = b64encode_chunked(sink.getvalue())
+        scrap = scrap._replace(data=encoded.decode("ascii"))
+        if data_type:
+            scrap = scrap._replace(metadata=dict(scrap.metadata or {}, type=data_type))
+        if options.compression:
+            scrap = record_options(scrap, dict(compression=options.compression))
+        return scrap
+
+    def summarize(self, data):
+        if isinstance(data, pd.DataFrame):
+            return summarize_dataframe(data)
+        # Keep slow import lazy
+        import pyarrow as pa
+
+        if isinstance(data, pa.RecordBatch):
+            return summarize_table(data, "record_batch")
+        if isinstance(data, pa.Table):
+            return summarize_table(data)
+        return summarize_table(data.to_arrow(), "polars")
+
+    def decode(self, scrap, as_arrow=False, columns=None, filters=None, head=None, **kwargs):
+        """
+        Decodes the scrap to the type it was glued as, or to a `pyarrow.Table`
+        when `as_arrow` is set. The table can be projected to `columns`, filtered
+        with parquet style `filters` and limited to its first `head` rows, in
+        which case later record batches aren't read. Other options are passed
+        along to `Table.to_pandas` for dataframes.
+        """
+        # Keep slow import lazy
+        import pyarrow as pa
+
+        reader = pa.ipc.open_stream(pa.py_buffer(payload_bytes(scrap.data)))
+        if head is None or filters is not None:
+            table = reader.read_all()
+        else:
+            batches, rows = [], 0
+            while rows < head:
+                try:
+                    batch = reader.read_next_batch()
+                except StopIteration:
+                    break
+                batches.append(batch)
+                rows += batch.num_rows
+            table = pa.Table.from_batches(batches, schema=reader.schema)
+        if filters is not None:
+            import pyarrow.parquet as pq
+
+            table = table.filter(pq.filters_to_expression(filters))
+        if columns is not None:
+            table = table.select(columns)
+        if head is not None:
+            table = table.slice(0, head)
+        data_type = (scrap.metadata or {}).get("type")
+        if as_arrow or data_type == "table":
+            data = table
+        elif data_type == "record_batch":
+            data = pa.RecordBatch.from_arrays(
+                [column.combine_chunks() for column in table.columns], schema=table.schema
+            )
+        elif data_type == "polars":
+            try:
+                import polars
+            except ImportError:
+                raise ImportError(
+                    "Scrap (name={}) holds a polars DataFrame. Please install polars "
+                    "to decode it, or read it with `as_arrow=True`".format(scrap.name)
+                )
+            data = polars.from_arrow(table)
+        else:
+            data = table.to_pandas(**kwargs)
+        return scrap._replace(data=data)
+
+
+class NumpyArrayEncoder(object):
+    """
+    Stores numpy arrays as their raw contiguous buffer, with the dtype and shape
+    recorded in the scrap metadata. The buffer can be compressed with any codec
+    supported by pyarrow (e.g. "lz4" or "zstd"). Decoding views the buffer with
+    `np.frombuffer`, so decoded arrays are read-only, and arrays read from
+    external blobs are memory mapped.
+
+    Parameters
+    ----------
+    compression: str (optional)
+        Buffer compression codec. Can be overridden by the `compression` option
+        of `encode`.
+    """
+
+    ENCODER_NAME = 'numpy'
+    BINARY = True
+
+    def __init__(self, compression=None):
+        self.compression = compression
+
+    def name(self):
+        return self.ENCODER_NAME
+
+    def encodable(self, data):
+        # Object and structured arrays have no portable raw buffer
+        return isinstance(data, np.ndarray) and not data.dtype.hasobject and not data.dtype.fields
+
+    def encode(self, scrap, compression=None, **kwargs):
+        # Unlike np.ascontiguousarray, keeps the shape of 0-d arrays
+        array = np.require(scrap.data, requirements="C")
+        metadata = dict(scrap.metadata or {}, dtype=array.dtype.str, shape=list(array.shape))
+        # A flat byte view of the array, avoiding a copy of its data
+        buffer = array.reshape(-1).view(np.uint8)
+        compression = compression or self.compression
+        if compression:
+            # Keep slow import lazy
+            import pyarrow as pa
+
+            buffer = pa.compress(buffer, codec=compression, asbytes=True)
+            metadata.update(compression=compression, size=array.nbytes)
+        return scrap._replace(data=b64encode_chunked(buffer).decode("ascii"), metadata=metadata)
+
+    def summarize(self, data):
+        summary = {
+            "type": "ndarray",
+            "rows": int(data.shape[0]) if data.ndim else None,
+            "shape": list(data.shape),
+            "dtype": data.dtype.str,
+            "nbytes": int(data.nbytes),
+        }
+        # Only real numbers and datetimes, as complex and timedelta dtypes are np.number too
+        if data.size and data.dtype.kind in "iufM":
+            with warnings.catch_warnings():
+                # All NaN arrays have no min/max, recorded as None
+                warnings.simplefilter("ignore", RuntimeWarning)
+                summary["min"] = _json_scalar(np.nanmin(data))
+                summary["max"] = _json_scalar(np.nanmax(data))
+        return summary
+
+    def decode(self, scrap, head=None, **kwargs):
+        """
+        Decodes the scrap to a read-only array. With `head`, only the first
+        `head` entries along the first axis are returned (0-d arrays are returned whole).
+        """
+        metadata = scrap.metadata or {}
+        if "dtype" not in metadata or "shape" not in metadata:
+            raise ScrapbookException(
+                "Scrap (name={}) has no dtype or shape to decode an array with".format(scrap.name)
+            )
+        buffer = payload_bytes(scrap.data)
+        if metadata.get("compression"):
+            # Keep slow import lazy
+            import pyarrow as pa
+
+            buffer = pa.decompress(buffer, metadata["size"], codec=metadata["compression"])
+        array = np.frombuffer(buffer, dtype=np.dtype(metadata["dtype"]))
+        array.setflags(write=False)
+        array = array.reshape(tuple(metadata["shape"]))
+        if head is not None and array.ndim:
+            # 0-d arrays have no rows to take the head of
+            array = array[:head]
+        return scrap._replace(data=array)
 
 
 registry = DataEncoderRegistry()
@@ -226,3 +695,5 @@ registry.register(TextEncoder())
 registry.register(JsonEncoder())
 registry.register(DisplayEncoder())
 registry.register(PandasArrowDataframeEncoder())
+registry.register(ArrowIpcEncoder())
+registry.register(NumpyArrayEncoder())
@@ -7,21 +7,29 @@ Provides the various model wrapper objects for scrapbook
 from __future__ import unicode_literals
 import os
 import copy
-import nbformat
+import numbers
 import collections
+import numpy as np
 import pandas as pd
 
 from six import string_types
 from collections import OrderedDict
 
 # We lean on papermill's readers to connect to remote stores
-from papermill.iorw import papermill_io
+from papermill.iorw import papermill_io, list_notebook_files
 
-from .scraps import Scrap, Scraps, payload_to_scrap, scrap_to_payload
+from .blobs import BlobRef
+from .scraps import Scrap, Scraps, LazyScrap, has_data, payload_to_scrap, scrap_to_payload
 from .schemas import GLUE_PAYLOAD_PREFIX, RECORD_PAYLOAD_PREFIX
-from .encoders import registry as encoder_registry
+from .readers import (
+    read_scrap_node,
+    reads_node,
+    read_notebook_metadata,
+    notebook_identity,
+    is_local_path,
+)
 from .exceptions import ScrapbookException
-from .utils import kernel_required, deprecated
+from .utils import kernel_required, deprecated, concurrent_map
 
 try:
     from urllib.parse import urlparse  # Py3
@@ -29,6 +37,166 @@ except ImportError:
     from urlparse import urlparse  # Py2
 
 
+def is_scalar(value):
+    """Returns True for values which fit a typed table cell (numbers, strings, booleans and None)"""
+    return value is None or isinstance(value, (numbers.Number, string_types))
+
+
+METRICS_COLUMNS = ["filename", "cell_index", "execution_count", "duration", "start_time", "end_time"]
+
+
+def metrics_dataframe(notebooks, keyed=True):
+    """
+    Builds the metrics dataframe of executed cells across `(key, notebook)`
+    pairs. Cell details are gathered into column lists in a single pass and
+    typed once, with a trailing "key" column when `keyed`.
+    """
+    columns = {name: [] for name in METRICS_COLUMNS}
+    keys = []
+    for key, nb in notebooks:
+        filename = nb.filename
+        for i, cell in enumerate(nb.cells):
+            execution_count = cell.get("execution_count")
+            if not execution_count:
+                continue
+            papermill = cell.metadata.get("papermill", {})
+            columns["filename"].append(filename)
+            columns["cell_index"].append(i)
+            columns["execution_count"].append(execution_count)
+            columns["duration"].append(papermill.get("duration", 0.0))
+            columns["start_time"].append(papermill.get("start_time"))
+            columns["end_time"].append(papermill.get("end_time"))
+            keys.append(key)
+
+    df = pd.DataFrame(
+        OrderedDict(
+            [
+                ("filename", pd.Series(columns["filename"], dtype=object)),
+                ("cell_index", np.array(columns["cell_index"], dtype=np.int64)),
+                ("execution_count", np.array(columns["execution_count"], dtype=np.int64)),
+                # Missing durations (None) become NaN
+                ("duration", np.array(columns["duration"], dtype=np.float64)),
+                ("start_time", pd.to_datetime(columns["start_time"], errors="coerce")),
+                ("end_time", pd.to_datetime(columns["end_time"], errors="coerce")),
+            ]
+        )
+    )
+    if keyed:
+        df["key"] = pd.Series(keys, dtype=object)
+    return df
+
+
+def papermill_metrics_dataframe(metrics):
+    """Translates a metrics dataframe to papermill's ["filename", "cell", "value", "type"] form"""
+    values = [
+        metrics["filename"],
+        ["Out [{}]".format(count) for count in metrics["execution_count"]],
+        metrics["duration"],
+        ["time (s)"] * len(metrics),
+    ]
+    columns = ["filename", "cell", "value", "type"]
+    if "key" in metrics:
+        values.append(metrics["key"])
+        columns.append("key")
+    # Built row-wise to keep papermill's (untyped when empty) frame
+    return pd.DataFrame(list(zip(*values)), columns=columns)
+
+
+def scrap_to_arrow(scrap):
+    """
+    Returns the data of a tabular scrap as a `pyarrow.Table`. Lazy scraps which
+    aren't decoded yet are decoded straight to Arrow by Arrow backed encoders.
+    """
+    # Keep slow import lazy
+    import pyarrow as pa
+
+    if isinstance(scrap, LazyScrap) and not scrap.decoded:
+        data = scrap.load(as_arrow=True)
+    else:
+        data = scrap.data
+    if isinstance(data, pa.Table):
+        return data
+    if isinstance(data, pa.RecordBatch):
+        return pa.Table.from_batches([data])
+    if isinstance(data, pd.DataFrame):
+        return pa.Table.from_pandas(data)
+    if hasattr(data, "to_arrow"):
+        # e.g. polars DataFrames
+        return data.to_arrow()
+    raise ScrapbookException(
+        "Scrap '{}' holds {} data, which can't be converted to a table".format(
+            scrap.name, type(data).__name__
+        )
+    )
+
+
+def dictionary_columns(values, lengths):
+    """
+    Returns a dictionary encoded column chunk per table, repeating the table's
+    entry of `values` over its `lengths` rows. The chunks share one dictionary
+    of the distinct values, with None values as nulls.
+    """
+    # Keep slow import lazy
+    import pyarrow as pa
+
+    codes, uniques, positions = [], [], {}
+    for value in values:
+        if value is None:
+            codes.append(-1)
+            continue
+        # Parameters can be unhashable JSON values, and 1 shouldn't match True or 1.0
+        identity = (type(value).__name__, repr(value))
+        if identity not in positions:
+            positions[identity] = len(uniques)
+            uniques.append(value)
+        codes.append(positions[identity])
+    try:
+        dictionary = pa.array(uniques)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # Mixed types fall back to their string representations
+        dictionary = pa.array([str(value) for value in uniques])
+    return [
+        pa.DictionaryArray.from_arrays(
+            pa.array(np.full(length, code, dtype=np.int32), mask=np.full(length, code < 0)),
+            dictionary,
+        )
+        for code, length in zip(codes, lengths)
+    ]
+
+
+def notebook_key(path):
+    """Returns the scrapbook key of the notebook at `path`, its file name without extension"""
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+def local_identity(path):
+    """
+    Returns the identity of the local notebook at `path` (see `notebook_identity`),
+    or None when it's remote or can't be checked without being read
+    """
+    if not is_local_path(path):
+        return None
+    try:
+        return notebook_identity(path)[0]
+    except OSError:
+        return None
+
+
+def read_parameters(path):
+    """Returns the papermill parameters of the notebook at `path`, only reading its metadata"""
+    return dict(read_notebook_metadata(path).get("papermill", {}).get("parameters", {}))
+
+
+def parameters_match(parameters, where):
+    """
+    Returns True if notebook `parameters` satisfy `where`, either a dict of
+    parameter values or a predicate called with the parameters dict
+    """
+    if callable(where):
+        return bool(where(parameters))
+    return all(name in parameters and parameters[name] == value for name, value in where.items())
+
+
 def merge_dicts(dicts):
     iterdicts = iter(dicts)
     outcome = next(iterdicts).copy()
@@ -48,9 +216,35 @@ class Notebook(object):
     ----------
     node_or_path : `nbformat.NotebookNode`, str
         a notebook object, or a path to a notebook object
+    streaming : bool (default: False)
+        indicator that a notebook path should be streamed, keeping only the
+        outputs which hold scraps in the `node` attribute
+    trusted : bool (default: False)
+        indicator that scrap payloads come from a trusted source, in which case
+        only their envelope is validated instead of the full schema
+    scraps : str or iterable[str] (optional)
+        names of the only scraps to extract, skipping all other payloads
+    validate : bool (default: True)
+        indicator that a notebook path should be validated against nbformat's
+        schema when read, which can be skipped when only scraps are needed
+    as_arrow : bool (default: False)
+        indicator that Arrow backed scraps (e.g. "pandas" and "arrow" encoded
+        dataframes) should decode to `pyarrow.Table` objects
+    blob_roots : str or iterable[str] (optional)
+        local directories, besides the notebook's own, which untrusted scrap
+        references may point into (see `blobs.BlobRef.check_location`)
     """
 
-    def __init__(self, node_or_path):
+    def __init__(
+        self,
+        node_or_path,
+        streaming=False,
+        trusted=False,
+        scraps=None,
+        validate=True,
+        as_arrow=False,
+        blob_roots=None,
+    ):
         if isinstance(node_or_path, string_types):
             path = urlparse(node_or_path).path
             if not os.path.splitext(path)[-1].endswith('ipynb'):
@@ -58,17 +252,35 @@ class Notebook(object):
                     "Requires an '.ipynb' file extension. Provided path: '{}'".format(node_or_path)
                 )
             self.path = node_or_path
-            self.node = nbformat.reads(papermill_io.read(node_or_path), as_version=4)
+            if streaming:
+                self.node = read_scrap_node(node_or_path)
+            else:
+                self.node = reads_node(papermill_io.read(node_or_path), validate=validate)
         else:
             self.path = ""
             self.node = node_or_path
 
+        self.trusted = trusted
+        self.as_arrow = as_arrow
+        if isinstance(scraps, string_types):
+            scraps = [scraps]
+        self.scrap_names = None if scraps is None else list(scraps)
+        if isinstance(blob_roots, string_types):
+            blob_roots = [blob_roots]
+        self.blob_roots = list(blob_roots or [])
+
         # Memoized traits
         self._scraps = None
         self._outputs = None
 
     def copy(self):
-        cp = Notebook(self.node.copy())
+        cp = Notebook(
+            self.node.copy(),
+            trusted=self.trusted,
+            scraps=self.scrap_names,
+            as_arrow=self.as_arrow,
+            blob_roots=self.blob_roots,
+        )
         cp.path = self.path
         return cp
 
@@ -104,21 +316,43 @@ class Notebook(object):
         """dict: parameters stored in the notebook metadata"""
         return self.metadata.get("papermill", {}).get("parameters", {})
 
+    def _decode_kwargs(self):
+        decode_kwargs = dict(trusted=self.trusted)
+        if self.as_arrow:
+            decode_kwargs["as_arrow"] = True
+        return decode_kwargs
+
+    def _wants_scrap(self, name):
+        return self.scrap_names is None or name in self.scrap_names
+
     def _extract_papermill_output_data(self, sig, payload):
         if sig.startswith(RECORD_PAYLOAD_PREFIX):
             # Fetch '+json' and strip the leading '+'
             encoder = sig.split(RECORD_PAYLOAD_PREFIX, 1)[1][1:]
             # First key is the only named payload
             for name, data in payload.items():
-                return encoder_registry.decode(Scrap(name, data, encoder))
+                if self._wants_scrap(name):
+                    return LazyScrap(name, data, encoder, **self._decode_kwargs())
+                return None
 
     def _extract_output_data_scraps(self, output):
         output_scraps = Scraps()
         for sig, payload in output.get("data", {}).items():
             # Backwards compatibility for papermill
             scrap = self._extract_papermill_output_data(sig, payload)
-            if scrap is None and sig.startswith(GLUE_PAYLOAD_PREFIX):
-                scrap = encoder_registry.decode(payload_to_scrap(payload))
+            # Skip validating unwanted payloads
+            wanted = sig.startswith(GLUE_PAYLOAD_PREFIX) and self._wants_scrap(payload.get("name"))
+            if scrap is None and wanted:
+                scrap = LazyScrap(
+                    *payload_to_scrap(payload, trusted=self.trusted),
+                    validated=True,
+                    **self._decode_kwargs()
+                )
+                if isinstance(scrap.raw_data, BlobRef):
+                    if self.path:
+                        # Blob paths are relative to the notebook
+                        scrap.raw_data.base = self.directory
+                    scrap.raw_data.roots = self.blob_roots
             if scrap:
                 output_scraps[scrap.name] = scrap
 
@@ -130,51 +364,69 @@ class Notebook(object):
         metadata = output.get("metadata", {})
         if "papermill" in metadata:
             output_name = output.metadata["papermill"].get("name")
-            if output_name:
+            if output_name and self._wants_scrap(output_name):
                 output_displays[output_name] = output
         # Only grab outputs that are displays
         elif metadata.get("scrapbook", {}).get("display"):
             output_name = output.metadata["scrapbook"].get("name")
-            if output_name:
+            if output_name and self._wants_scrap(output_name):
                 output_displays[output_name] = output
 
         return output_displays
 
+    def _extract_output_scraps(self, output):
+        output_data_scraps = self._extract_output_data_scraps(output)
+        output_displays = self._extract_output_displays(output)
+
+        # Combine displays with data while trying to preserve ordering
+        output_scraps = Scraps(
+            [
+                # Hydrate with output_displays, leaving the data undecoded
+                (scrap.name, scrap._replace(display=output_displays.get(scrap.name)))
+                for scrap in output_data_scraps.values()
+            ]
+        )
+        for name, display in output_displays.items():
+            if name not in output_scraps:
+                output_scraps[name] = Scrap(name, None, "display", display)
+        return output_scraps
+
+    def _fetch_named_scraps(self):
+        """
+        Returns the requested scraps in the requested order. As later outputs
+        override earlier ones, outputs are scanned from the end of the notebook
+        and the scan stops as soon as every requested name has been found.
+        """
+        scraps = {}
+        remaining = set(self.scrap_names)
+        outputs = (
+            output for cell in reversed(self.cells) for output in reversed(cell.get("outputs", []))
+        )
+        for output in outputs:
+            for name, scrap in self._extract_output_scraps(output).items():
+                if name in remaining:
+                    scraps[name] = scrap
+                    remaining.discard(name)
+            if not remaining:
+                break
+
+        return Scraps((name, scraps[name]) for name in self.scrap_names if name in scraps)
+
     def _fetch_scraps(self):
         """Returns a dictionary of the data recorded in a notebook."""
-        scraps = Scraps()
+        if self.scrap_names is not None:
+            return self._fetch_named_scraps()
 
+        scraps = Scraps()
         for cell in self.cells:
             for output in cell.get("outputs", []):
-                output_data_scraps = self._extract_output_data_scraps(output)
-                output_displays = self._extract_output_displays(output)
-
-                # Combine displays with data while trying to preserve ordering
-                output_scraps = Scraps(
-                    [
-                        # Hydrate with output_displays
-                        (
-                            scrap.name,
-                            Scrap(
-                                scrap.name,
-                                scrap.data,
-                                scrap.encoder,
-                                output_displays.get(scrap.name),
-                            ),
-                        )
-                        for scrap in output_data_scraps.values()
-                    ]
-                )
-                for name, display in output_displays.items():
-                    if name not in output_scraps:
-                        output_scraps[name] = Scrap(name, None, "display", display)
-                scraps.update(output_scraps)
+                scraps.update(self._extract_output_scraps(output))
 
         return scraps
 
     @property
     def scraps(self):
-        """dict: a dictionary of data found in the notebook"""
+        """dict: a dictionary of data found in the notebook, decoded on first access"""
         if self._scraps is None:
             self._scraps = self._fetch_scraps()
         return self._scraps
@@ -198,21 +450,16 @@ class Notebook(object):
     @property
     @deprecated('0.4.0', '`metrics`')
     def papermill_metrics(self):
-        return self.metrics
+        return papermill_metrics_dataframe(self.metrics)
 
     @property
     def metrics(self):
-        """pandas dataframe: dataframe of cell execution counts and times"""
-        df = pd.DataFrame(columns=["filename", "cell", "value", "type"])
-
-        for i, cell in enumerate(self.cells):
-            execution_count = cell.get("execution_count")
-            if not execution_count:
-                continue
-            name = "Out [{}]".format(str(execution_count))
-            value = cell.metadata.get("papermill", {}).get("duration", 0.0)
-            df.loc[i] = self.filename, name, value, "time (s)"
-        return df
+        """
+        pandas dataframe: dataframe of executed cells, with columns ["filename",
+        "cell_index", "execution_count", "duration", "start_time", "end_time"]
+        where durations are in seconds and times are as recorded by papermill
+        """
+        return metrics_dataframe([(None, self)], keyed=False)
 
     @property
     def parameter_dataframe(self):
@@ -292,7 +539,7 @@ class Notebook(object):
             scrap = self.scraps[name]
             if new_name:
                 scrap = scrap._replace(name=new_name)
-            if scrap.data is not None:
+            if has_data(scrap):
                 data, metadata = _prepare_ipy_data_format(
                     scrap.name, scrap_to_payload(scrap), scrap.encoder
                 )
@@ -314,23 +561,265 @@ class Notebook(object):
 class Scrapbook(collections.abc.MutableMapping):
     """
     A collection of notebooks represented as a dictionary of notebooks
+
+    Parameters
+    ----------
+    lazy : bool (default: False)
+        indicator that notebooks assigned by path are only loaded on first access
+    max_loaded : int (optional)
+        for lazy scrapbooks, the number of path assigned notebooks kept loaded,
+        evicting the least recently accessed ones back to their path
+    reader : callable (optional)
+        function loading a Notebook from a path, defaults to the `Notebook` model
     """
 
-    def __init__(self):
+    def __init__(self, lazy=False, max_loaded=None, reader=None):
         self._notebooks = OrderedDict()
+        self.lazy = lazy
+        self.max_loaded = max_loaded
+        self.reader = reader or Notebook
+        # Paths of lazily assigned notebooks, and which of those are loaded in LRU order
+        self._paths = {}
+        self._loaded = OrderedDict()
+        # Directory listing the notebooks were read from, and the (path, identity) of each
+        self._listing = None
+        self._sources = {}
+        # The `where` notebooks were last selected by, and the identity of the
+        # listed notebooks it excluded, by path
+        self._selection = None
+        # Parameters of each notebook, and the memoized index of them (see `parameter_index`)
+        self._parameters = {}
+        self._parameter_index = None
 
     def __setitem__(self, key, value):
-        # If notebook is a path str then load the notebook.
+        self._paths.pop(key, None)
+        self._loaded.pop(key, None)
+        self._sources.pop(key, None)
+        self._forget_parameters(key)
+        # If notebook is a path str then load the notebook (on first access when lazy).
         if isinstance(value, string_types):
-            value = Notebook(value)
+            if self.lazy:
+                self._paths[key] = value
+            else:
+                value = self.reader(value)
         self._notebooks.__setitem__(key, value)
 
     def __getitem__(self, key):
-        return self._notebooks.__getitem__(key)
+        notebook = self._notebooks.__getitem__(key)
+        if key in self._paths:
+            if isinstance(notebook, string_types):
+                notebook = self._notebooks[key] = self.reader(notebook)
+            self._loaded[key] = True
+            self._loaded.move_to_end(key)
+            if self.max_loaded is not None and len(self._loaded) > self.max_loaded:
+                evicted, _ = self._loaded.popitem(last=False)
+                self._notebooks[evicted] = self._paths[evicted]
+        return notebook
 
     def __delitem__(self, key):
+        self._paths.pop(key, None)
+        self._loaded.pop(key, None)
+        self._sources.pop(key, None)
+        self._forget_parameters(key)
         return self._notebooks.__delitem__(key)
 
+    def __contains__(self, key):
+        # Don't load (or evict) notebooks of lazy scrapbooks to check membership
+        return key in self._notebooks
+
+    def is_loaded(self, key):
+        """Returns True if the notebook under `key` is loaded in memory"""
+        return not isinstance(self._notebooks[key], string_types)
+
+    def _inherit(self, other):
+        """Adopts the notebooks (loaded or not) and their sources from another Scrapbook"""
+        self._notebooks.update(other._notebooks)
+        self._paths.update(other._paths)
+        self._loaded.update(other._loaded)
+        self._sources.update(other._sources)
+        self._parameters.update(other._parameters)
+        self._selection = other._selection
+        self._parameter_index = None
+
+    def _sync(self, notebook_paths, workers=None, executor="thread"):
+        """
+        Aligns the scrapbook with a listing of notebook paths. Only notebooks which
+        are new or changed since they were last read get read, and notebooks read
+        from a previous listing which are no longer listed get removed. Remote
+        notebooks can't be checked for changes without fetching them, so they are
+        always read again.
+        """
+        listed = OrderedDict()
+        for path in notebook_paths:
+            listed[notebook_key(path)] = (path, local_identity(path))
+
+        changed = [
+            key
+            for key, source in listed.items()
+            if key not in self._notebooks or source[1] is None or self._sources.get(key) != source
+        ]
+        changed_paths = [listed[key][0] for key in changed]
+        if self.lazy:
+            notebooks = changed_paths
+        else:
+            notebooks = concurrent_map(self.reader, changed_paths, workers, executor)
+
+        for key in [key for key in self._sources if key not in listed]:
+            del self[key]
+        for key, notebook in zip(changed, notebooks):
+            self[key] = notebook
+        self._sources.update(listed)
+        # Listed notebooks keep the listing order, ahead of any directly assigned ones
+        order = list(listed) + [key for key in self._notebooks if key not in listed]
+        self._notebooks = OrderedDict((key, self._notebooks[key]) for key in order)
+        self._parameter_index = None
+
+    def _forget_parameters(self, key):
+        self._parameters.pop(key, None)
+        self._parameter_index = None
+
+    def _notebook_parameters(self, key):
+        if key not in self._parameters:
+            if key in self._paths and not self.is_loaded(key):
+                # Only read the metadata of notebooks which aren't loaded
+                self._parameters[key] = read_parameters(self._paths[key])
+            else:
+                self._parameters[key] = self[key].parameters
+        return self._parameters[key]
+
+    @property
+    def parameter_index(self):
+        """
+        pandas dataframe: the notebooks' papermill parameters, with one row per
+        notebook indexed by key and one typed column per parameter. Built once
+        and kept until notebooks are added or removed. Lazy notebooks which
+        aren't loaded only have their metadata read.
+        """
+        if self._parameter_index is None:
+            keys = list(self._notebooks)
+            columns = OrderedDict()
+            for i, key in enumerate(keys):
+                parameters = self._notebook_parameters(key)
+                for name in sorted(parameters):
+                    if name not in columns:
+                        columns[name] = [None] * len(keys)
+                    columns[name][i] = parameters[name]
+            self._parameter_index = pd.DataFrame(columns, index=pd.Index(keys, name="key"))
+        return self._parameter_index
+
+    def where(self, expr=None, **parameters):
+        """
+        Returns a Scrapbook of the notebooks whose parameters match, selected
+        with the parameter index so the scraps of other notebooks are never
+        read or decoded. The selected notebooks are shared with this scrapbook,
+        and notebooks assigned by path stay unloaded until accessed.
+
+        Parameters
+        ----------
+        expr : str (optional)
+            a `pandas.DataFrame.query` expression over the parameter index,
+            e.g. "alpha > 0.1 and model in ['xgb', 'lgbm']"
+        parameters :
+            parameter values the notebooks must have, e.g. `alpha=0.1`
+        """
+        index = self.parameter_index
+        mask = np.ones(len(index), dtype=bool)
+
+        def by_value(name):
+            value = parameters[name]
+            return isinstance(value, (list, dict)) or value is None
+
+        # Scalar filters are masked through the index first
+        for name in sorted(parameters, key=by_value):
+            value = parameters[name]
+            if name not in index.columns:
+                mask[:] = False
+            elif by_value(name):
+                # Lists, dicts and None aren't compared element-wise by pandas, so
+                # only the notebooks still selected are compared one by one
+                for i in np.flatnonzero(mask):
+                    params = self._notebook_parameters(index.index[i])
+                    mask[i] = parameters_match(params, {name: value})
+            else:
+                mask &= index[name].eq(value).to_numpy(dtype=bool)
+        if expr is not None:
+            mask &= index.index.isin(index.query(expr).index)
+
+        selected = Scrapbook(lazy=self.lazy, max_loaded=self.max_loaded, reader=self.reader)
+        for key in index.index[mask]:
+            selected._notebooks[key] = self._notebooks[key]
+            for source, target in [
+                (self._paths, selected._paths),
+                (self._loaded, selected._loaded),
+                (self._sources, selected._sources),
+                (self._parameters, selected._parameters),
+            ]:
+                if key in source:
+                    target[key] = source[key]
+        return selected
+
+    def _select_notebooks(self, notebook_paths, where, workers=None, executor="thread"):
+        """
+        Returns the notebook paths whose parameters match `where`, along with
+        their parameters by key, only reading the notebooks' metadata. Local
+        notebooks which are unchanged since the last listing keep their previous
+        verdict without their metadata being read again.
+        """
+        sources = [(path, local_identity(path)) for path in notebook_paths]
+        # Previous verdicts only hold for the same selection
+        previous, excluded = self._selection or (None, {})
+        kept, unread = {}, []
+        for source in sources:
+            path, identity = source
+            if identity is None or previous is None or previous != where:
+                unread.append(path)
+            elif excluded.get(path) == identity:
+                kept[path] = False
+            elif self._sources.get(notebook_key(path)) == source:
+                kept[path] = True
+            else:
+                unread.append(path)
+
+        parameters = dict(zip(unread, concurrent_map(read_parameters, unread, workers, executor)))
+        for path in unread:
+            kept[path] = parameters_match(parameters[path], where)
+        self._selection = where, {path: identity for path, identity in sources if not kept[path]}
+        return [path for path in notebook_paths if kept[path]], {
+            notebook_key(path): params for path, params in parameters.items() if kept[path]
+        }
+
+    def _read_listing(self, notebook_paths=None):
+        """Reads (or re-reads) the notebooks listed as recorded by `read_notebooks`"""
+        path, path_filter, where, workers, executor = self._listing
+        if notebook_paths is None:
+            notebook_paths = sorted(filter(path_filter, list_notebook_files(path)))
+        parameters = {}
+        if where is not None:
+            notebook_paths, parameters = self._select_notebooks(
+                notebook_paths, where, workers, executor
+            )
+        else:
+            self._selection = None
+        self._sync(notebook_paths, workers, executor)
+        # Spare the parameter index from loading the notebooks to learn them again
+        self._parameters.update(parameters)
+
+    def refresh(self):
+        """
+        Re-lists the directory this scrapbook was read from with `read_notebooks`,
+        reading only the notebooks which are new or have changed and removing the
+        ones which were deleted. Unchanged notebooks keep their memoized scraps.
+
+        Returns
+        -------
+        scrapbook : Scrapbook
+            This scrapbook, refreshed in place.
+        """
+        if self._listing is None:
+            raise ScrapbookException("Only scrapbooks created by `read_notebooks` can refresh")
+        self._read_listing()
+        return self
+
     def __iter__(self):
         return self._notebooks.__iter__()
 
@@ -345,8 +834,7 @@ class Scrapbook(collections.abc.MutableMapping):
         # Backwards compatible dataframe interface
 
         df_list = []
-        for key in self._notebooks:
-            nb = self._notebooks[key]
+        for key, nb in self.items():
             df = nb.papermill_dataframe
             df["key"] = key
             df_list.append(df)
@@ -355,18 +843,12 @@ class Scrapbook(collections.abc.MutableMapping):
     @property
     @deprecated('0.4.0', 'metrics')
     def papermill_metrics(self):
-        return self.metrics
+        return papermill_metrics_dataframe(self.metrics)
 
     @property
     def metrics(self):
-        """list: a list of metrics from a collection of notebooks"""
-        df_list = []
-        for key in self._notebooks:
-            nb = self._notebooks[key]
-            df = nb.metrics
-            df["key"] = key
-            df_list.append(df)
-        return pd.concat(df_list).reset_index(drop=True)
+        """pandas dataframe: the notebooks' metrics dataframes combined, with a "key" column"""
+        return metrics_dataframe(self.items())
 
     @property
     def notebooks(self):
@@ -376,13 +858,163 @@ class Scrapbook(collections.abc.MutableMapping):
     @property
     def notebook_scraps(self):
         """dict: a dictionary of the notebook scraps by key."""
-        return OrderedDict([(key, nb.scraps) for key, nb in self._notebooks.items()])
+        return OrderedDict([(key, nb.scraps) for key, nb in self.items()])
 
     @property
     def scraps(self):
         """dict: a dictionary of the merged notebook scraps."""
         return Scraps(merge_dicts(nb.scraps for nb in self.notebooks))
 
+    def scraps_table(self, names=None, include_parameters=True):
+        """
+        Returns a wide dataframe with one row per notebook, indexed by key, and
+        one column per parameter and scrap. Columns are gathered as whole lists
+        and typed once, so numeric columns are int64 or float64 (float64 when
+        some notebooks lack the value) rather than object.
+
+        Parameters
+        ----------
+        names : str or iterable[str] (optional)
+            names of the scraps to tabulate. Defaults to the scalar (number,
+            string or boolean) "json" and "text" scraps found in every notebook
+            they appear in, leaving other encoders' scraps undecoded.
+        include_parameters : bool (default: True)
+            indicator that the notebooks' parameters should lead the scrap
+            columns. Scraps take precedence over parameters of the same name.
+        """
+        if isinstance(names, string_types):
+            names = [names]
+        keys = list(self.keys())
+        # Scraps are gathered apart from parameters, with `missing` marking
+        # notebooks without the scrap, so dropping a scrap keeps its parameter
+        missing = object()
+        scrap_columns = OrderedDict()
+
+        def gather(i, name, value):
+            column = scrap_columns.get(name)
+            if column is None:
+                column = scrap_columns[name] = [missing] * len(keys)
+            column[i] = value
+
+        nonscalar = set()
+        for i, key in enumerate(keys):
+            scraps = self[key].scraps
+            if names is not None:
+                for name in names:
+                    if name in scraps and has_data(scraps[name]):
+                        gather(i, name, scraps[name].data)
+                continue
+            for name, scrap in scraps.items():
+                if scrap.encoder not in ("json", "text") or not has_data(scrap):
+                    continue
+                if is_scalar(scrap.data):
+                    gather(i, name, scrap.data)
+                else:
+                    nonscalar.add(name)
+        for name in nonscalar:
+            # Only tabulate scraps which are scalar in every notebook
+            scrap_columns.pop(name, None)
+
+        columns = OrderedDict()
+        if include_parameters:
+            for name, values in self.parameter_index.items():
+                columns[name] = list(values)
+        for name, values in scrap_columns.items():
+            fallback = columns.get(name, [None] * len(keys))
+            columns[name] = [
+                default if value is missing else value for value, default in zip(values, fallback)
+            ]
+
+        return pd.DataFrame(columns, index=pd.Index(keys, name="key"))
+
+    def concat_scrap(
+        self, name, key_column="notebook", include_parameters=True, workers=None, executor="thread"
+    ):
+        """
+        Concatenates a tabular scrap (e.g. a dataframe glued by every notebook
+        of a sweep) across the notebooks holding it into one `pyarrow.Table`.
+        Scraps are decoded straight to Arrow where their encoder allows it, and
+        their record batches are concatenated without being copied. Columns
+        missing from some of the scraps are filled with nulls.
+
+        Parameters
+        ----------
+        name : str
+            name of the scrap to concatenate
+        key_column : str (default: "notebook")
+            name of the leading column holding each row's notebook key, or None
+            to leave it out
+        include_parameters : bool (default: True)
+            indicator that the notebooks' parameters should be added as columns
+            after the key column
+        workers : int (optional)
+            number of notebooks whose scraps are decoded concurrently
+        executor : str (default: "thread")
+            either "thread" or "process" to select the pool the workers run in
+
+        Notes
+        -----
+        The key and parameter columns are dictionary encoded, so they take one
+        small index per row, and convert to categoricals with `to_pandas`.
+        """
+        # Keep slow import lazy
+        import pyarrow as pa
+
+        keys, scraps = [], []
+        for key, nb in self.items():
+            scrap = nb.scraps.get(name)
+            if scrap is not None and has_data(scrap):
+                keys.append(key)
+                scraps.append(scrap)
+        tables = concurrent_map(scrap_to_arrow, scraps, workers, executor)
+        # Pandas metadata describes a single frame's index, not the concatenation
+        tables = [table.replace_schema_metadata(None) for table in tables]
+        lengths = [table.num_rows for table in tables]
+
+        extra = OrderedDict()
+        if key_column is not None:
+            extra[key_column] = dictionary_columns(keys, lengths)
+        if include_parameters:
+            parameters = [self[key].parameters for key in keys]
+            for param in sorted(set().union(*parameters)):
+                values = [params.get(param) for params in parameters]
+                extra[param] = dictionary_columns(values, lengths)
+        for table in tables:
+            for column in set(extra).intersection(table.column_names):
+                raise ScrapbookException(
+                    "Scrap '{}' already has a '{}' column".format(name, column)
+                )
+
+        tables = [
+            pa.Table.from_arrays(
+                [columns[i] for columns in extra.values()] + table.columns,
+                names=list(extra) + table.column_names,
+            )
+            for i, table in enumerate(tables)
+        ]
+        if not tables:
+            return pa.table(OrderedDict((column, pa.array([])) for column in extra))
+        try:
+            schema = pa.unify_schemas([table.schema for table in tables])
+        except (pa.ArrowInvalid, pa.ArrowTypeError) as e:
+            raise ScrapbookException(
+                "Scrap '{}' has conflicting column types across notebooks: {}".format(name, e)
+            )
+        return pa.concat_tables(
+            [
+                pa.Table.from_arrays(
+                    [
+                        table.column(field.name).cast(field.type)
+                        if field.name in table.column_names
+                        else pa.nulls(table.num_rows, field.type)
+                        for field in schema
+                    ],
+                    schema=schema,
+                )
+                for table in tables
+            ]
+        )
+
     def scraps_report(
         self, scrap_names=None, notebook_names=None, include_data=False, headers=True
     ):
@@ -0,0 +1,334 @@
+# -*- coding: utf-8 -*-
+"""
+readers.py
+
+Provides alternative strategies for loading notebooks from storage
+"""
+import io
+import os
+import hashlib
+import nbformat
+
+from nbformat.reader import get_version, NotJSONError
+from nbformat.v4.rwbase import rejoin_lines
+
+# We lean on papermill's readers to connect to remote stores
+from papermill.iorw import papermill_io, LocalHandler
+
+from .log import logger
+from .utils import json_loads
+from .schemas import GLUE_PAYLOAD_PREFIX, RECORD_PAYLOAD_PREFIX
+
+SCRAP_PAYLOAD_PREFIXES = (GLUE_PAYLOAD_PREFIX, RECORD_PAYLOAD_PREFIX)
+# Cell and output fields needed to rebuild scraps and execution metrics
+CELL_KEYS = ("cell_type", "execution_count", "id", "metadata")
+OUTPUT_KEYS = ("execution_count", "metadata", "output_type")
+# Bytes read from the end of local notebooks to find their metadata (see `read_notebook_metadata`)
+METADATA_TAIL_SIZE = 2 ** 16
+
+
+def is_display_output(output):
+    """Returns True if the output is a named scrapbook (or papermill) display"""
+    metadata = output.get("metadata", {})
+    if "papermill" in metadata:
+        return bool(metadata["papermill"].get("name"))
+    return bool(metadata.get("scrapbook", {}).get("display"))
+
+
+def is_scrap_output(output):
+    """Returns True if the output holds scrap data or a scrap display"""
+    return is_display_output(output) or any(
+        sig.startswith(SCRAP_PAYLOAD_PREFIXES) for sig in output.get("data", {})
+    )
+
+
+def is_local_path(path):
+    """Returns True if papermill resolves `path` to the local filesystem"""
+    return isinstance(papermill_io.get_handler(path), LocalHandler)
+
+
+def notebook_identity(path):
+    """
+    Returns an `(identity, source)` pair for the notebook at `path`. Local
+    notebooks are identified by their absolute path, modification time and size
+    without being read. Remote stores don't expose those details through
+    papermill, so remote notebooks are identified by a hash of their content,
+    which is returned as `source` to avoid fetching it twice.
+    """
+    if is_local_path(path):
+        stat = os.stat(path)
+        return [os.path.abspath(path), stat.st_mtime_ns, stat.st_size], None
+    source = papermill_io.read(path)
+    return [path, hashlib.sha256(source.encode("utf-8")).hexdigest()], source
+
+
+def slim_node(node):
+    """
+    Returns a copy of `node` holding only what `read_scrap_node` would keep:
+    notebook metadata, cell execution details, and the outputs which carry scrap
+    payloads or scrap displays.
+    """
+    cells = []
+    for cell in node.cells:
+        slim_cell = {key: cell[key] for key in CELL_KEYS if key in cell}
+        if "outputs" in cell:
+            slim_cell["outputs"] = [output for output in cell.outputs if is_scrap_output(output)]
+        cells.append(slim_cell)
+    return nbformat.from_dict(
+        dict(
+            cells=cells,
+            metadata=node.metadata,
+            nbformat=node.nbformat,
+            nbformat_minor=node.nbformat_minor,
+        )
+    )
+
+
+def reads_node(text, validate=True):
+    """
+    Parses notebook JSON text into a version 4 `NotebookNode`. This mirrors
+    `nbformat.reads`, but parses with scrapbook's JSON backend (see
+    `utils.json_loads`) and makes nbformat's schema validation optional.
+
+    Parameters
+    ----------
+    text : str or bytes
+        The notebook JSON text.
+    validate : bool (default: True)
+        Validate the notebook against nbformat's schema, logging any error
+        the way `nbformat.reads` does.
+    """
+    try:
+        nb_dict = json_loads(text)
+    except ValueError as e:
+        raise NotJSONError("Notebook does not appear to be JSON: {!r:.60}".format(text)) from e
+    major, minor = get_version(nb_dict)
+    if major not in nbformat.versions:
+        raise nbformat.NBFormatError("Unsupported nbformat version {}".format(major))
+    node = nbformat.convert(nbformat.versions[major].to_notebook_json(nb_dict, minor=minor), 4)
+    if validate:
+        try:
+            nbformat.validate(node)
+        except nbformat.ValidationError as e:
+            logger.error("Notebook JSON is invalid: %s", e)
+    return node
+
+
+def _open_stream(path):
+    if is_local_path(path):
+        return open(path, "rb")
+    # Remote stores only expose whole-file reads
+    return io.BytesIO(papermill_io.read(path).encode("utf-8"))
+
+
+def _iter_map(events):
+    """Yields the keys of a map, leaving each value's events to the caller"""
+    for event, value in events:
+        if event == "end_map":
+            return
+        yield value
+
+
+def _iter_array(events):
+    """Yields the first event of each array item, leaving the rest to the caller"""
+    for event, value in events:
+        if event == "end_array":
+            return
+        yield event, value
+
+
+def _build(events, event, value):
+    """Materializes the JSON value which starts with the given event"""
+    if event == "start_map":
+        return {key: _build(events, *next(events)) for key in _iter_map(events)}
+    if event == "start_array":
+        return [_build(events, *item) for item in _iter_array(events)]
+    return value
+
+
+def _skip(events, event):
+    """Consumes the JSON value which starts with the given event without building it"""
+    if event not in ("start_map", "start_array"):
+        return
+    depth = 1
+    for event, _ in events:
+        if event in ("start_map", "start_array"):
+            depth += 1
+        elif event in ("end_map", "end_array"):
+            depth -= 1
+            if depth == 0:
+                return
+
+
+def _scan_displays(events):
+    """
+    Returns whether each output of the notebook, in order, is a scrap display.
+    Only output metadata is built, every other value is skipped.
+    """
+    displays = []
+    for key in _iter_map(events):
+        event, value = next(events)
+        if key != "cells":
+            _skip(events, event)
+            continue
+        for _ in _iter_array(events):
+            for cell_key in _iter_map(events):
+                event, value = next(events)
+                if cell_key != "outputs":
+                    _skip(events, event)
+                    continue
+                for _ in _iter_array(events):
+                    output = {}
+                    for output_key in _iter_map(events):
+                        event, value = next(events)
+                        if output_key == "metadata":
+                            output[output_key] = _build(events, event, value)
+                        else:
+                            _skip(events, event)
+                    displays.append(is_display_output(output))
+    return displays
+
+
+def _read_output(events, display):
+    output = {}
+    for key in _iter_map(events):
+        event, value = next(events)
+        if key == "data":
+            data = output["data"] = {}
+            for sig in _iter_map(events):
+                event, value = next(events)
+                # Only displays keep their non-scrap mime bundles
+                if display or sig.startswith(SCRAP_PAYLOAD_PREFIXES):
+                    data[sig] = _build(events, event, value)
+                else:
+                    _skip(events, event)
+        elif key in OUTPUT_KEYS:
+            output[key] = _build(events, event, value)
+        else:
+            _skip(events, event)
+    return output
+
+
+def _read_cell(events, displays):
+    cell = {}
+    for key in _iter_map(events):
+        event, value = next(events)
+        if key == "outputs":
+            outputs = cell["outputs"] = []
+            for event, value in _iter_array(events):
+                output = _read_output(events, next(displays))
+                if is_scrap_output(output):
+                    outputs.append(output)
+        elif key in CELL_KEYS:
+            cell[key] = _build(events, event, value)
+        else:
+            _skip(events, event)
+    return cell
+
+
+def read_scrap_node(path):
+    """
+    Streams the notebook at `path` and returns a partial `NotebookNode` holding
+    only what scrapbook needs: notebook metadata, cell execution details, and the
+    outputs carrying scrap payloads or scrap displays. Cell sources and all other
+    outputs are skipped as they are read, so peak memory is bounded by the largest
+    single output rather than the size of the notebook.
+
+    Output metadata follows the output's mime bundles in notebooks written with
+    sorted keys, so a first pass over the stream only reads output metadata to
+    find the scrap displays, and the second pass builds the bundles of those
+    alone. Remote notebooks are fetched whole before being streamed.
+
+    Parameters
+    ----------
+    path : str
+        Path to a notebook `.ipynb` file.
+
+    Returns
+    -------
+    node : nbformat.NotebookNode
+        The partial notebook node.
+    """
+    try:
+        import ijson
+    except ImportError:
+        raise ImportError(
+            "Streaming notebook reads require the 'ijson' package. "
+            "Install it with `pip install scrapbook[streaming]`."
+        )
+
+    node = {}
+    with _open_stream(path) as f:
+        events = ijson.basic_parse(f, use_float=True)
+        next(events)  # Opening of the notebook map
+        displays = iter(_scan_displays(events))
+        f.seek(0)
+        events = ijson.basic_parse(f, use_float=True)
+        next(events)
+        for key in _iter_map(events):
+            event, value = next(events)
+            if key == "cells":
+                node["cells"] = [_read_cell(events, displays) for _ in _iter_array(events)]
+            elif key in ("metadata", "nbformat", "nbformat_minor"):
+                node[key] = _build(events, event, value)
+            else:
+                _skip(events, event)
+
+    if node.get("nbformat") != 4:
+        # Older formats need nbformat's conversions, so fall back to a full read
+        return reads_node(papermill_io.read(path))
+    return rejoin_lines(nbformat.from_dict(node))
+
+
+def _read_tail_metadata(path, tail_size=METADATA_TAIL_SIZE):
+    """
+    Returns the metadata of a local notebook from the last `tail_size` bytes of
+    its file, or None if they don't hold it. Notebooks are written with sorted
+    keys, so the notebook metadata follows the cells. Occurrences of
+    "metadata" are tried from the end until one starts a suffix which parses
+    as the rest of the notebook's map (nested ones leave brackets unbalanced).
+    """
+    with open(path, "rb") as f:
+        f.seek(max(0, os.fstat(f.fileno()).st_size - tail_size))
+        tail = f.read()
+    end = len(tail)
+    while True:
+        end = tail.rfind(b'"metadata"', 0, end)
+        if end < 0:
+            return None
+        try:
+            rest = json_loads(b"{" + tail[end:])
+        except ValueError:
+            continue
+        if isinstance(rest, dict) and "nbformat" in rest and isinstance(rest["metadata"], dict):
+            return rest["metadata"]
+
+
+def read_notebook_metadata(path):
+    """
+    Returns the notebook level metadata (e.g. papermill's parameters) of the
+    notebook at `path`, reading as little of the notebook as possible. Local
+    notebooks are read from the end of their file where the metadata is
+    normally written, other notebooks are streamed with `ijson` if installed,
+    and fully read as a last resort.
+
+    Parameters
+    ----------
+    path : str
+        Path to a notebook `.ipynb` file.
+
+    Returns
+    -------
+    metadata : nbformat.NotebookNode
+        The notebook metadata.
+    """
+    metadata = _read_tail_metadata(path) if is_local_path(path) else None
+    if metadata is None:
+        try:
+            import ijson
+        except ImportError:
+            return reads_node(papermill_io.read(path), validate=False).metadata
+        with _open_stream(path) as f:
+            # Only the notebook's own metadata has the top level "metadata" prefix
+            metadata = next(ijson.items(f, "metadata", use_float=True), {})
+    return nbformat.from_dict(metadata)
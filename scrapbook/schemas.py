@@ -9,6 +9,8 @@ import os
 import json
 import glob
 
+from jsonschema.validators import validator_for
+
 
 def _load_schema(fname):
     with open(fname) as f:
@@ -33,3 +35,17 @@ def scrap_schema(version=LATEST_SCRAP_VERSION):
         return SCHEMAS[version]
     except KeyError:
         raise ValueError("No schema found for version {}".format(version))
+
+
+_VALIDATORS = {}
+
+
+def scrap_validator(version=LATEST_SCRAP_VERSION):
+    """Returns the jsonschema validator for a payload version, compiled once per version"""
+    try:
+        return _VALIDATORS[version]
+    except KeyError:
+        schema = scrap_schema(version)
+        validator_cls = validator_for(schema)
+        validator_cls.check_schema(schema)
+        return _VALIDATORS.setdefault(version, validator_cls(schema))
@@ -6,30 +6,176 @@ Provides the Scrap and Scraps abstractions for housing data
 """
 import pandas as pd
 
-from jsonschema import validate as json_validate, ValidationError
+from six import string_types
+from jsonschema import ValidationError
 from collections import namedtuple, OrderedDict
 
 from .log import logger
-from .schemas import scrap_schema, LATEST_SCRAP_VERSION
+from .blobs import BlobRef
+from .schemas import scrap_validator, LATEST_SCRAP_VERSION
 from .exceptions import ScrapbookDataException
 
 # dataclasses would be nice here...
-Scrap = namedtuple("Scrap", ["name", "data", "encoder", "display"])
-Scrap.__new__.__defaults__ = (None,)
+Scrap = namedtuple("Scrap", ["name", "data", "encoder", "display", "metadata"])
+Scrap.__new__.__defaults__ = (None, None)
 
 
-def scrap_to_payload(scrap):
+class LazyScrap(Scrap):
+    """
+    A Scrap which holds the raw payload data read from a notebook and only
+    decodes it on first access of `data`. The decoded value is memoized on the
+    scrap, so each payload is decoded at most once. Payloads referencing external
+    blobs (see `blobs.BlobRef`) are only read at that point as well. Scraps of
+    payloads which were `validated` when read skip the schema validation of the
+    decode. Extra keyword arguments are passed along to the encoder registry's
+    `decode` call.
+    """
+
+    def __new__(
+        cls, name, data, encoder, display=None, metadata=None, validated=False, **decode_kwargs
+    ):
+        scrap = super(LazyScrap, cls).__new__(cls, name, data, encoder, display, metadata)
+        scrap.__dict__["_decode_kwargs"] = decode_kwargs
+        scrap.__dict__["_validated"] = validated
+        return scrap
+
+    @property
+    def raw_data(self):
+        """any: the payload data as stored in the notebook"""
+        return tuple.__getitem__(self, 1)
+
+    @property
+    def decoded(self):
+        """bool: indicator that the payload data has already been decoded"""
+        return "_data" in self.__dict__
+
+    def _decode(self, **options):
+        # Avoid circular imports
+        from .encoders import registry as encoder_registry
+
+        raw_data, decode_kwargs = self.raw_data, dict(self.__dict__["_decode_kwargs"], **options)
+        trusted, referenced = decode_kwargs.get("trusted", False), isinstance(raw_data, BlobRef)
+        if referenced:
+            if not trusted:
+                raw_data.check_location()
+            raw_data = raw_data.load(verify=not trusted)
+        if referenced or self.__dict__.get("_validated"):
+            # The payload was validated when read (along with any reference), so
+            # only its envelope gets checked again
+            decode_kwargs["trusted"] = True
+        return encoder_registry.decode(
+            Scrap(self.name, raw_data, self.encoder, metadata=self.metadata), **decode_kwargs
+        ).data
+
+    @property
+    def data(self):
+        if not self.decoded:
+            self.__dict__["_data"] = self._decode()
+        return self.__dict__["_data"]
+
+    def load(self, columns=None, filters=None, head=None, **kwargs):
+        """
+        Decodes a projection of the scrap's data without memoizing it, so only
+        the parts needed are decoded. Dataframe encoders ("pandas" and "arrow")
+        support all the options below, "numpy" supports `head`, and encoders
+        ignore options they don't support.
+
+        Parameters
+        ----------
+        columns : list[str] (optional)
+            Names of the only columns to decode.
+        filters : list (optional)
+            Row filters in pyarrow's parquet `filters` format, e.g.
+            `[("score", ">", 0.5)]`. Parquet row groups which can't match are
+            skipped.
+        head : int (optional)
+            Number of leading rows to decode.
+        kwargs :
+            Other options passed along to the encoder's `decode`.
+        """
+        options = dict(columns=columns, filters=filters, head=head)
+        options = {key: value for key, value in options.items() if value is not None}
+        return self._decode(**dict(options, **kwargs))
+
+    def __iter__(self):
+        return iter((self.name, self.data, self.encoder, self.display, self.metadata))
+
+    def __getitem__(self, index):
+        return tuple(self)[index]
+
+    def __eq__(self, other):
+        return tuple(self) == other
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(tuple(self))
+
+    def __repr__(self):
+        return repr(Scrap(*self))
+
+    def __getnewargs__(self):
+        # Pickle the raw payload (and any memoized data via __dict__) without decoding
+        return (self.name, self.raw_data, self.encoder, self.display, self.metadata)
+
+    def _replace(self, **kwargs):
+        if "data" in kwargs:
+            return Scrap(*self)._replace(**kwargs)
+        scrap = LazyScrap(**dict(zip(self._fields, self.__getnewargs__()), **kwargs))
+        scrap.__dict__.update(self.__dict__)
+        return scrap
+
+
+def has_data(scrap):
+    """Returns True if the scrap carries data, without decoding lazy scraps"""
+    if isinstance(scrap, LazyScrap):
+        return scrap.raw_data is not None
+    return scrap.data is not None
+
+
+def validate_payload(payload, version=LATEST_SCRAP_VERSION, trusted=False):
+    """
+    Validates a payload against the scrap schema of the given version.
+
+    Parameters
+    ----------
+    payload: dict
+        The payload to validate
+    version: int
+        The schema version to validate against
+    trusted: bool (default: False)
+        Only check the payload envelope (name, encoder, version and the presence
+        of data) instead of the full schema, for payloads from trusted sources
+    """
+    if not trusted:
+        scrap_validator(version).validate(payload)
+        return
+    for key, types in [("name", string_types), ("encoder", string_types), ("version", int)]:
+        if not isinstance(payload.get(key), types):
+            raise ValidationError("{!r} is not a valid scrap {}".format(payload.get(key), key))
+    if payload.get("data") is None and not isinstance(payload.get("ref"), dict):
+        raise ValidationError("'data' or 'ref' is a required property")
+    if not isinstance(payload.get("metadata", {}), dict):
+        raise ValidationError("{!r} is not a valid scrap metadata".format(payload["metadata"]))
+
+
+def scrap_to_payload(scrap, trusted=False):
     """Translates scrap data to the output format"""
-    # Apply new keys here as needed (like `ref`)
-    payload = {
-        "name": scrap.name,
-        "data": scrap.data,
-        "encoder": scrap.encoder,
-        "version": LATEST_SCRAP_VERSION,
-    }
+    # Lazy scraps already hold their encoded form
+    data = scrap.raw_data if isinstance(scrap, LazyScrap) else scrap.data
+    payload = {"name": scrap.name, "data": data, "encoder": scrap.encoder}
+    if isinstance(data, BlobRef):
+        # Data stored outside of the notebook is only referenced, from wherever the
+        # payload ends up when the reference was read relative to a notebook
+        payload.pop("data")
+        payload["ref"] = dict(data if data.base is None else data.resolved())
+    payload["version"] = LATEST_SCRAP_VERSION
+    if scrap.metadata:
+        payload["metadata"] = scrap.metadata
     # Ensure we're conforming to our schema
     try:
-        json_validate(payload, scrap_schema(LATEST_SCRAP_VERSION))
+        validate_payload(payload, LATEST_SCRAP_VERSION, trusted=trusted)
     except ValidationError as e:
         raise ScrapbookDataException(
             "Scrap (name={name}) contents do not conform to required type structures: {error}".format(
@@ -40,7 +186,7 @@ def scrap_to_payload(scrap):
     return payload
 
 
-def payload_to_scrap(payload):
+def payload_to_scrap(payload, trusted=False):
     """Translates data output format to a scrap"""
     if "version" not in payload:
         raise ScrapbookDataException(
@@ -57,7 +203,7 @@ def payload_to_scrap(payload):
         )
     else:
         try:
-            json_validate(payload, scrap_schema(payload["version"]))
+            validate_payload(payload, payload["version"], trusted=trusted)
         except ValidationError as e:
             raise ScrapbookDataException(
                 "Scrap payload (name={name}) contents do not conform to required "
@@ -66,7 +212,15 @@ def payload_to_scrap(payload):
             )
     # If future schema versions would require further manipulation
     # then implement various version loaders here
-    return Scrap(name=payload.get("name"), data=payload.get("data"), encoder=payload.get("encoder"))
+    data = payload.get("data")
+    if isinstance(payload.get("ref"), dict):
+        data = BlobRef(payload["ref"])
+    return Scrap(
+        name=payload.get("name"),
+        data=data,
+        encoder=payload.get("encoder"),
+        metadata=payload.get("metadata"),
+    )
 
 
 class Scraps(OrderedDict):
@@ -75,7 +229,7 @@ class Scraps(OrderedDict):
 
     @property
     def data_scraps(self):
-        return OrderedDict([(k, v) for k, v in self.items() if v.data is not None])
+        return OrderedDict([(k, v) for k, v in self.items() if has_data(v)])
 
     @property
     def data_dict(self):
@@ -89,6 +243,29 @@ class Scraps(OrderedDict):
     def display_dict(self):
         return {name: scrap.display for name, scrap in self.display_scraps.items()}
 
+    def describe(self):
+        """
+        Returns a dataframe of the summaries recorded for scraps when they were
+        glued (see the encoders' `summarize` methods), without decoding them.
+        Has columns ["name", "encoder", "type", "rows", "nbytes", "summary"], with
+        missing values for scraps without a summary.
+        """
+        rows = []
+        for scrap in self.values():
+            summary = (scrap.metadata or {}).get("summary")
+            details = summary or {}
+            rows.append(
+                [
+                    scrap.name,
+                    scrap.encoder,
+                    details.get("type"),
+                    details.get("rows"),
+                    details.get("nbytes"),
+                    summary,
+                ]
+            )
+        return pd.DataFrame(rows, columns=["name", "encoder", "type", "rows", "nbytes", "summary"])
+
     @property
     def dataframe(self):
         """pandas dataframe: dataframe of cell scraps"""
@@ -4,13 +4,16 @@ import six
 import mock
 import pytest
 import collections
+import pandas as pd
 
 from IPython.display import Image
 
 from . import get_fixture_path
 from .. import utils
 from ..api import glue, read_notebooks
+from ..scraps import payload_to_scrap
 from ..schemas import GLUE_PAYLOAD_FMT
+from ..encoders import registry as encoder_registry
 
 
 @pytest.fixture(scope='session', autouse=True)
@@ -89,6 +92,17 @@ def test_glue(mock_display, name, scrap, encoder, data, metadata):
     mock_display.assert_called_once_with(data, metadata=metadata, raw=True)
 
 
+@mock.patch("IPython.display.display")
+def test_glue_encoder_options(mock_display):
+    df = pd.DataFrame(data={"foo": [1.5, 2.5]})
+    glue("df", df, encoder_options={"compression": "zstd", "compression_level": 5})
+    (data,), _ = mock_display.call_args
+    payload = data[GLUE_PAYLOAD_FMT.format(encoder="pandas")]
+    assert payload["metadata"]["options"] == {"compression": "zstd", "compression_level": 5}
+    assert payload["metadata"]["summary"]["rows"] == 2
+    pd.testing.assert_frame_equal(encoder_registry.decode(payload_to_scrap(payload)).data, df)
+
+
 @pytest.mark.parametrize(
     "name,obj,data,encoder,metadata,display",
     [
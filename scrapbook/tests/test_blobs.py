@@ -0,0 +1,273 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import os
+import mmap
+import mock
+import pytest
+import nbformat
+import numpy as np
+import pandas as pd
+
+from nbformat.v4 import new_notebook, new_code_cell, new_output
+
+from .. import utils, blobs
+from .. import glue, read_notebook
+from ..blobs import BlobRef, BlobStore
+from ..scraps import Scrap, LazyScrap, scrap_to_payload, payload_to_scrap
+from ..exceptions import ScrapbookDataException
+
+
+@pytest.fixture(autouse=True)
+def kernel_mock():
+    with mock.patch.object(utils, "is_kernel") as _fixture:
+        _fixture.return_value = True
+        yield _fixture
+
+
+@pytest.fixture
+def store(tmpdir):
+    return BlobStore(str(tmpdir.join("blobs")))
+
+
+def test_put_and_load(store):
+    ref = store.put(b"some bytes")
+    assert ref["size"] == 10
+    assert os.path.basename(ref["path"]) == ref["sha256"] + ".blob"
+    content = ref.load(verify=True)
+    assert isinstance(content, mmap.mmap)
+    assert content[:] == b"some bytes"
+
+
+def test_put_deduplicates(store):
+    assert store.put(b"abc") == store.put(b"abc")
+    assert len(os.listdir(store.directory)) == 1
+
+
+def test_load_empty(store):
+    assert store.put(b"").load() == b""
+
+
+def test_load_json_format(store):
+    ref = store.put(b'{"a": [1, 2]}', "json")
+    assert ref.load() == {"a": [1, 2]}
+
+
+def test_load_size_mismatch(store):
+    ref = store.put(b"abc")
+    with open(ref["path"], "wb") as f:
+        f.write(b"abcd")
+    with pytest.raises(ScrapbookDataException):
+        ref.load()
+
+
+def test_load_verify(store):
+    ref = store.put(b"abc")
+    with open(ref["path"], "wb") as f:
+        f.write(b"xyz")
+    assert ref.load()[:] == b"xyz"
+    with pytest.raises(ScrapbookDataException):
+        ref.load(verify=True)
+
+
+@pytest.mark.parametrize(
+    "path,base,expected",
+    [
+        ("blobs/a.blob", None, "blobs/a.blob"),
+        ("blobs/a.blob", "/notebooks", "/notebooks/blobs/a.blob"),
+        ("/data/a.blob", "/notebooks", "/data/a.blob"),
+        ("blobs/a.blob", "s3://bucket/notebooks/", "s3://bucket/notebooks/blobs/a.blob"),
+    ],
+)
+def test_ref_location(path, base, expected):
+    assert BlobRef({"path": path, "size": 0, "sha256": ""}, base=base).location == expected
+
+
+@pytest.mark.parametrize(
+    "path", ["/etc/passwd", "../secret.blob", "blobs/../../secret.blob", "http://host/a.blob"]
+)
+def test_untrusted_refs_stay_in_notebook_directory(store, path):
+    ref = BlobRef({"path": path, "size": 0, "sha256": ""})
+    with pytest.raises(ScrapbookDataException):
+        ref.check_location()
+    with pytest.raises(ScrapbookDataException):
+        LazyScrap("foo", ref, "json").data
+
+
+def test_trusted_refs_follow_any_path(store):
+    ref = store.put(b'"abc"', "json")
+    assert os.path.isabs(ref["path"])
+    assert LazyScrap("foo", ref, "json", trusted=True).data == "abc"
+    with pytest.raises(ScrapbookDataException):
+        LazyScrap("foo", ref, "json").data
+
+
+def test_untrusted_refs_verify_digest(tmpdir):
+    with tmpdir.as_cwd():
+        ref = BlobStore("blobs").put(b'"abc"', "json")
+        ref.check_location()
+        assert LazyScrap("foo", ref, "json").data == "abc"
+        with open(ref["path"], "wb") as f:
+            f.write(b'"xyz"')
+        assert LazyScrap("foo", ref, "json", trusted=True).data == "xyz"
+        with pytest.raises(ScrapbookDataException):
+            LazyScrap("foo", ref, "json").data
+
+
+def test_untrusted_refs_within_roots(store, tmpdir):
+    ref = store.put(b'"abc"', "json")
+    with pytest.raises(ScrapbookDataException):
+        ref.check_location()
+    BlobRef(ref, roots=[store.directory]).check_location()
+    BlobRef(ref, base=str(tmpdir)).check_location()
+    assert LazyScrap("foo", BlobRef(ref, roots=[str(tmpdir)]), "json").data == "abc"
+    escaping = str(tmpdir.join("blobs", "..", "..", "a.blob"))
+    outside = BlobRef(dict(ref, path=escaping), roots=[store.directory])
+    with pytest.raises(ScrapbookDataException):
+        outside.check_location()
+
+
+def _glued_output(mock_display):
+    (payload,), kwargs = mock_display.call_args
+    return new_output(output_type="display_data", data=payload, metadata=kwargs["metadata"])
+
+
+@pytest.mark.parametrize("store", ["blobs", None])
+@mock.patch("IPython.display.display")
+def test_read_notebook_written_elsewhere(mock_display, tmpdir, store):
+    # e.g. `papermill in.ipynb out/run1.ipynb`, with the kernel running in tmpdir
+    with tmpdir.as_cwd():
+        if store is None:
+            blobs.set_offload(threshold=0)
+        try:
+            glue("big", {"foo": ["bar", 1]}, store=store)
+        finally:
+            blobs.set_offload()
+    path = str(tmpdir.join("out", "run1.ipynb"))
+    tmpdir.mkdir("out")
+    cell = new_code_cell("", outputs=[_glued_output(mock_display)])
+    nbformat.write(new_notebook(cells=[cell]), path)
+    blob_root = str(tmpdir.join(store or blobs.DEFAULT_BLOB_DIRECTORY))
+
+    with pytest.raises(ScrapbookDataException, match="blob_roots"):
+        read_notebook(path).scraps["big"].data
+    assert read_notebook(path, trusted=True).scraps["big"].data == {"foo": ["bar", 1]}
+    assert read_notebook(path, blob_roots=blob_root).scraps["big"].data == {"foo": ["bar", 1]}
+
+
+@mock.patch("IPython.display.display")
+def test_reglue_resolves_refs(mock_display, tmpdir):
+    with tmpdir.as_cwd():
+        glue("big", {"foo": ["bar", 1]}, store="blobs")
+        path = str(tmpdir.join("result.ipynb"))
+        cell = new_code_cell("", outputs=[_glued_output(mock_display)])
+        nbformat.write(new_notebook(cells=[cell]), path)
+    notebook = read_notebook(path)
+    notebook.reglue("big")
+    (payload,), _ = mock_display.call_args
+    (ref,) = [payload[sig]["ref"] for sig in payload]
+    # The reference no longer depends on the directory of the notebook it came from
+    assert ref["path"] == str(tmpdir.join("blobs", ref["sha256"] + ".blob"))
+    assert "root" not in ref
+    assert BlobRef(ref).load() == {"foo": ["bar", 1]}
+
+
+def test_ref_payload_round_trip():
+    ref = {"path": "blobs/a.blob", "size": 3, "sha256": "abc"}
+    payload = scrap_to_payload(Scrap("foo", BlobRef(ref), "pandas"))
+    assert "data" not in payload
+    assert payload["ref"] == ref
+    scrap = payload_to_scrap(payload)
+    assert isinstance(scrap.data, BlobRef)
+    assert payload_to_scrap(payload, trusted=True) == scrap
+
+
+def test_ref_payload_validation_error():
+    payload = {"name": "foo", "encoder": "json", "version": 1, "ref": {"path": "a.blob"}}
+    with pytest.raises(ScrapbookDataException):
+        payload_to_scrap(payload)
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        pd.DataFrame(data={"foo": [1.5, 2.5], "bar": ["a", "b"]}),
+        {"foo": ["bar", 1]},
+        np.arange(12.0).reshape(3, 4),
+    ],
+)
+@mock.patch("IPython.display.display")
+def test_glue_to_store_and_read(mock_display, tmpdir, data):
+    with tmpdir.as_cwd():
+        glue("big", data, store="blobs")
+    (payload,), kwargs = mock_display.call_args
+    output = new_output(output_type="display_data", data=payload, metadata=kwargs["metadata"])
+    (sig,) = payload
+    assert "data" not in payload[sig]
+    assert not os.path.isabs(payload[sig]["ref"]["path"])
+    assert payload[sig]["ref"]["root"] == str(tmpdir)
+
+    path = str(tmpdir.join("result.ipynb"))
+    nbformat.write(new_notebook(cells=[new_code_cell("", outputs=[output])]), path)
+    scrap = read_notebook(path).scraps["big"]
+    assert not scrap.decoded
+    if isinstance(data, pd.DataFrame):
+        pd.testing.assert_frame_equal(scrap.data, data)
+    elif isinstance(data, np.ndarray):
+        np.testing.assert_array_equal(scrap.data, data)
+        # Arrays are views of the memory mapped blob
+        base = scrap.data
+        while isinstance(base, np.ndarray):
+            base = base.base
+        assert isinstance(base.obj, mmap.mmap)
+    else:
+        assert scrap.data == data
+
+
+@pytest.fixture
+def offload(tmpdir):
+    yield lambda **kwargs: blobs.set_offload(directory=str(tmpdir.join("auto")), **kwargs)
+    blobs.set_offload()
+
+
+@pytest.mark.parametrize(
+    "data,expected", [("abc", 3), ("😍", 4), ({"a": 1}, 8), (BlobRef({"size": 10}), 10)]
+)
+def test_encoded_size(data, expected):
+    assert blobs.encoded_size(data) == expected
+
+
+@pytest.mark.parametrize("size,offloaded", [(10, False), (11, True)])
+def test_select_store_threshold(offload, size, offloaded):
+    offload(threshold=10)
+    store = blobs.select_store(Scrap("foo", "a" * size, "text"))
+    assert isinstance(store, BlobStore) == offloaded
+
+
+def test_select_store_reuses_json_size(offload):
+    offload(threshold=10)
+    scrap = Scrap("foo", [1], "json", metadata={"summary": {"nbytes": 11}})
+    with mock.patch.object(blobs, "encoded_size") as mock_size:
+        assert isinstance(blobs.select_store(scrap), BlobStore)
+        assert not mock_size.called
+
+
+def test_select_store_explicit(offload, store):
+    offload(threshold=10)
+    assert blobs.select_store(Scrap("foo", "a", "text"), store) is store
+    assert blobs.select_store(Scrap("foo", "a" * 20, "text"), False) is None
+
+
+def test_select_store_budget(offload):
+    offload(budget=10)
+    with pytest.warns(UserWarning, match="payload budget"):
+        assert blobs.select_store(Scrap("foo", "a" * 20, "text")) is None
+
+
+@mock.patch("IPython.display.display")
+def test_glue_offloads_large_scraps(mock_display, offload):
+    offload(threshold=100)
+    glue("small", "a" * 10)
+    glue("large", "a" * 1000)
+    glue("kept", "a" * 1000, store=False)
+    payloads = [call[0][0] for call in mock_display.call_args_list]
+    assert ["ref" in list(payload.values())[0] for payload in payloads] == [False, True, False]
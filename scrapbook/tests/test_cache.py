@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import os
+import mock
+import shutil
+import pytest
+
+from . import get_notebook_path
+from .. import read_notebook, read_notebooks
+from ..cache import ScrapCache
+
+
+@pytest.fixture
+def notebook_path(tmpdir):
+    path = str(tmpdir.join("result1.ipynb"))
+    shutil.copy(get_notebook_path("collection/result1.ipynb"), path)
+    return path
+
+
+@pytest.fixture
+def cache(tmpdir):
+    return ScrapCache(str(tmpdir.join("cache")))
+
+
+def test_cache_hit(notebook_path, cache):
+    nb = read_notebook(notebook_path, cache=cache)
+    with mock.patch("scrapbook.models.reads_node") as mock_reads:
+        cached = read_notebook(notebook_path, cache=cache)
+        assert not mock_reads.called
+    assert cached.path == notebook_path
+    assert cached.scraps == nb.scraps
+    assert cached.parameters == nb.parameters
+    assert cached.cell_timing == nb.cell_timing
+
+
+def test_cache_directory_option(notebook_path, tmpdir):
+    directory = str(tmpdir.join("cache_dir"))
+    read_notebook(notebook_path, cache=directory)
+    assert len(os.listdir(directory)) == 1
+
+
+def test_cache_miss_on_change(notebook_path, cache):
+    read_notebook(notebook_path, cache=cache)
+    with open(notebook_path) as f:
+        content = f.read()
+    with open(notebook_path, "w") as f:
+        f.write(content.replace('"hello"', '"changed"'))
+    nb = read_notebook(notebook_path, cache=cache)
+    assert nb.parameters["bar"] == "changed"
+
+
+def test_cache_keyed_on_options(notebook_path, cache):
+    read_notebook(notebook_path, cache=cache)
+    read_notebook(notebook_path, cache=cache, trusted=True)
+    assert len(list(cache._entries())) == 2
+
+
+def test_cache_decode(notebook_path, tmpdir):
+    cache = ScrapCache(str(tmpdir.join("cache")), decode=True)
+    read_notebook(notebook_path, cache=cache)
+    cached = read_notebook(notebook_path, cache=cache)
+    assert all(scrap.decoded for scrap in cached.scraps.data_scraps.values())
+
+
+def test_cache_eviction(tmpdir, cache):
+    for name in ["a", "b", "c"]:
+        path = str(tmpdir.join(name + ".ipynb"))
+        shutil.copy(get_notebook_path("collection/result1.ipynb"), path)
+        read_notebook(path, cache=cache)
+    entry_size = cache.size // 3
+    cache.evict(entry_size * 2)
+    assert len(list(cache._entries())) == 2
+    cache.clear()
+    assert cache.size == 0
+
+
+def test_cache_store_only_evicts_over_budget(tmpdir):
+    cache = ScrapCache(str(tmpdir.join("cache")))
+    with mock.patch.object(ScrapCache, "evict") as mock_evict:
+        for name in ["a", "b", "c"]:
+            path = str(tmpdir.join(name + ".ipynb"))
+            shutil.copy(get_notebook_path("collection/result1.ipynb"), path)
+            read_notebook(path, cache=cache)
+        assert not mock_evict.called
+        assert cache._size == cache.size
+        cache.max_size = cache.size - 1
+        read_notebook(get_notebook_path("collection/result2.ipynb"), cache=cache)
+        assert mock_evict.called
+
+
+def test_cache_entries_removed_concurrently(notebook_path, cache):
+    read_notebook(notebook_path, cache=cache)
+    (entry,) = cache._entries()
+    os.remove(entry.path)
+    with mock.patch.object(cache, "_entries", return_value=[entry]):
+        assert cache.size == 0
+        cache.evict(0)
+    with mock.patch("os.utime", side_effect=FileNotFoundError):
+        read_notebook(notebook_path, cache=cache)
+        assert read_notebook(notebook_path, cache=cache).parameters == dict(foo=1, bar="hello")
+
+
+def test_cache_corrupt_entry(notebook_path, cache):
+    read_notebook(notebook_path, cache=cache)
+    (entry,) = cache._entries()
+    with open(entry.path, "wb") as f:
+        f.write(b"not a pickle")
+    nb = read_notebook(notebook_path, cache=cache)
+    assert nb.parameters == dict(foo=1, bar="hello")
+
+
+def test_read_notebooks_cache(cache):
+    book = read_notebooks(get_notebook_path("collection"), cache=cache)
+    cached = read_notebooks(get_notebook_path("collection"), cache=cache)
+    assert len(list(cache._entries())) == 2
+    assert cached.scraps == book.scraps
@@ -1,8 +1,12 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
+import sys
+import json
 import pytest
+import collections
 import mock
+import numpy as np
 import pyarrow
 import pandas as pd
 
@@ -15,13 +19,16 @@ from ..encoders import (
     JsonEncoder,
     TextEncoder,
     PandasArrowDataframeEncoder,
+    ArrowIpcEncoder,
+    NumpyArrayEncoder,
 )
 from ..exceptions import (
+    ScrapbookException,
     ScrapbookDataException,
     ScrapbookInvalidEncoder,
     ScrapbookMissingEncoder,
 )
-from ..scraps import Scrap
+from ..scraps import Scrap, scrap_to_payload
 
 try:
     from json.decoder import JSONDecodeError
@@ -251,6 +258,139 @@ def test_unsupported_arrow_conversions(test_input):
         PandasArrowDataframeEncoder().encode(test_input)
 
 
+@pytest.mark.parametrize("compression", [None, "lz4", "zstd"])
+def test_arrow_encode_and_decode(compression):
+    df = pd.DataFrame(
+        data={"foo": pd.Series(["bar", "😍"], dtype='str'), "baz": pd.Series([1.5, 2.0])}
+    )
+    scrap = ArrowIpcEncoder(compression=compression).encode(Scrap("foo", df, "arrow"))
+    assert isinstance(scrap.data, str)
+    scrap_back = ArrowIpcEncoder().decode(scrap)
+    pd.testing.assert_frame_equal(scrap_back.data, df)
+    assert scrap_back.name == "foo"
+    assert scrap_back.encoder == "arrow"
+
+
+def test_arrow_compression_option():
+    df = pd.DataFrame(data={"foo": [0] * 10000})
+    plain = ArrowIpcEncoder().encode(Scrap("foo", df, "arrow"))
+    compressed = ArrowIpcEncoder().encode(Scrap("foo", df, "arrow"), compression="zstd")
+    assert len(compressed.data) < len(plain.data)
+    pd.testing.assert_frame_equal(ArrowIpcEncoder().decode(compressed).data, df)
+
+
+def test_arrow_decode_as_arrow():
+    df = pd.DataFrame(data={"foo": [1, 2, 3]})
+    scrap = ArrowIpcEncoder().encode(Scrap("foo", df, "arrow"))
+    table = ArrowIpcEncoder().decode(scrap, as_arrow=True).data
+    assert table.equals(pyarrow.Table.from_pandas(df))
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        pyarrow.table({"foo": [1, 2, 3], "bar": ["a", "b", None]}),
+        pyarrow.record_batch([pyarrow.array([1.5, 2.5])], names=["foo"]),
+        pyarrow.record_batch([pyarrow.array([], type=pyarrow.int8())], names=["foo"]),
+    ],
+)
+def test_arrow_native_round_trip(data):
+    scrap = ArrowIpcEncoder().encode(Scrap("foo", data, "arrow"))
+    decoded = ArrowIpcEncoder().decode(scrap).data
+    assert type(decoded) is type(data)
+    assert decoded.equals(data)
+
+
+def test_arrow_polars_round_trip():
+    class FakePolarsFrame(object):
+        def __init__(self, table):
+            self.table = table
+
+        def to_arrow(self):
+            return self.table
+
+    polars = mock.Mock(DataFrame=FakePolarsFrame, from_arrow=FakePolarsFrame)
+    table = pyarrow.table({"foo": [1, 2, 3]})
+    with mock.patch.dict(sys.modules, polars=polars):
+        assert ArrowIpcEncoder().encodable(FakePolarsFrame(table))
+        scrap = ArrowIpcEncoder().encode(Scrap("foo", FakePolarsFrame(table), "arrow"))
+        assert scrap.metadata == {"type": "polars"}
+        decoded = ArrowIpcEncoder().decode(scrap).data
+    assert isinstance(decoded, FakePolarsFrame)
+    assert decoded.table.equals(table)
+
+
+def test_pandas_decode_as_arrow():
+    df = pd.DataFrame(data={"foo": [1, 2, 3], "bar": ["a", "b", "c"]})
+    scrap = PandasArrowDataframeEncoder().encode(Scrap("foo", df, "pandas"))
+    table = PandasArrowDataframeEncoder().decode(scrap, as_arrow=True).data
+    assert isinstance(table, pyarrow.Table)
+    pd.testing.assert_frame_equal(table.to_pandas(), df)
+
+
+def test_registry_decode_as_arrow_ignored(registry):
+    scrap = Scrap(name="foo", data=[1, 2], encoder="json")
+    assert registry.decode(scrap, as_arrow=True) == scrap
+
+
+@pytest.mark.parametrize(
+    "data,expected",
+    [(pd.DataFrame(), True), (pyarrow.table({"foo": [1]}), True), ([1, 2], False)],
+)
+def test_arrow_encodable(data, expected):
+    assert ArrowIpcEncoder().encodable(data) == expected
+
+
+@pytest.mark.parametrize(
+    "array",
+    [
+        np.arange(12.0).reshape(3, 4),
+        np.arange(12).reshape(3, 4).T,
+        np.array(5),
+        np.zeros((0, 3), dtype="int32"),
+        np.array(["2020-01-01", "NaT"], dtype="datetime64[ns]"),
+        np.array([True, False]),
+    ],
+)
+@pytest.mark.parametrize("compression", [None, "lz4", "zstd"])
+def test_numpy_encode_and_decode(array, compression):
+    scrap = NumpyArrayEncoder().encode(Scrap("foo", array, "numpy"), compression=compression)
+    assert isinstance(scrap.data, str)
+    assert scrap.metadata["dtype"] == array.dtype.str
+    assert scrap.metadata["shape"] == list(array.shape)
+    decoded = NumpyArrayEncoder().decode(scrap).data
+    np.testing.assert_array_equal(decoded, array)
+    assert decoded.dtype == array.dtype
+    assert not decoded.flags.writeable
+
+
+def test_numpy_decode_missing_metadata():
+    with pytest.raises(ScrapbookException):
+        NumpyArrayEncoder().decode(Scrap("foo", "", "numpy"))
+
+
+@pytest.mark.parametrize(
+    "data,expected",
+    [
+        (np.arange(3), True),
+        (np.array([{}, []], dtype=object), False),
+        (np.zeros(2, dtype=[("a", "i4"), ("b", "f8")]), False),
+        ([1, 2], False),
+    ],
+)
+def test_numpy_encodable(data, expected):
+    assert NumpyArrayEncoder().encodable(data) == expected
+
+
+def test_pandas_encode_records_options():
+    df = pd.DataFrame(data={"foo": [1.5, 2.5], "bar": ["a", "b"]})
+    options = {"compression": "zstd", "use_dictionary": False, "row_group_size": 1}
+    scrap = PandasArrowDataframeEncoder().encode(Scrap("foo", df, "pandas"), **options)
+    assert scrap.metadata == {"options": options}
+    pd.testing.assert_frame_equal(PandasArrowDataframeEncoder().decode(scrap).data, df)
+    assert PandasArrowDataframeEncoder().encode(Scrap("foo", df, "pandas")).metadata is None
+
+
 @pytest.fixture
 def registry():
     registry = DataEncoderRegistry()
@@ -350,6 +490,8 @@ def test_missing_encode(registry):
         (['foo', 'bar'], "json"),
         ({'foo': 'bar'}, "json"),
         (pd.DataFrame(data={"foo": pd.Series(["bar"], dtype='str')}), "pandas"),
+        (pyarrow.table({"foo": ["bar"]}), "arrow"),
+        (np.arange(3), "numpy"),
     ],
 )
 def test_determine_encoder_name(data, expected_encoder):
@@ -360,3 +502,255 @@ def test_determine_encoder_name(data, expected_encoder):
 def test_determine_encoder_name_fails(data):
     with pytest.raises(NotImplementedError):
         full_registry.determine_encoder_name(data)
+
+
+def test_registry_configure(registry):
+    encoder = mock.Mock()
+    encoder.name.return_value = "mocked"
+    encoder.encode.side_effect = lambda scrap, **kwargs: scrap
+    registry.register(encoder)
+    registry.configure("mocked", level=1, codec="zstd")
+    assert registry.options("mocked") == {"level": 1, "codec": "zstd"}
+    registry.encode(Scrap(name="foo", data="bar", encoder="mocked"), level=3)
+    encoder.encode.assert_called_once_with(
+        Scrap(name="foo", data="bar", encoder="mocked"), level=3, codec="zstd"
+    )
+    registry.configure("mocked")
+    assert registry.options("mocked") == {}
+
+
+class Probed(object):
+    ENCODER_NAME = "probed"
+
+    def __init__(self):
+        self.encodable = mock.Mock(side_effect=lambda data: data == "probe me")
+
+    def name(self):
+        return self.ENCODER_NAME
+
+    def encode(self, scrap, **kwargs):
+        return scrap
+
+    def decode(self, scrap, **kwargs):
+        return scrap
+
+
+def test_determine_encoder_name_cached(registry):
+    with mock.patch.object(JsonEncoder, "encodable_types", return_value=(list, dict, str)) as types:
+        assert registry.determine_encoder_name([1]) == "json"
+        assert registry.determine_encoder_name([2]) == "json"
+        assert registry.determine_encoder_name(collections.OrderedDict()) == "json"
+        # Resolved once per type, through the MRO for subclasses
+        assert types.call_count == 2
+
+
+def test_determine_encoder_name_probes_in_order(registry):
+    probed = Probed()
+    registry.deregister("json")
+    registry.register(probed)
+    registry.register(JsonEncoder())
+    assert registry.determine_encoder_name("probe me") == "probed"
+    assert registry.determine_encoder_name("other") == "json"
+    assert probed.encodable.call_count == 2
+    with pytest.raises(NotImplementedError):
+        registry.determine_encoder_name(object())
+
+
+def test_determine_encoder_name_invalidated(registry):
+    assert registry.determine_encoder_name("foo") == "json"
+    registry.register(Probed())
+    registry.register(TextEncoder())
+    del registry["json"]
+    assert registry.determine_encoder_name("foo") == "text"
+    registry.reset()
+    with pytest.raises(NotImplementedError):
+        registry.determine_encoder_name("foo")
+
+
+@pytest.fixture
+def wide_frame():
+    return pd.DataFrame(
+        data={"a": range(100), "b": [str(i) for i in range(100)], "c": [i / 2 for i in range(100)]}
+    )
+
+
+@pytest.mark.parametrize(
+    "encoder,options",
+    [
+        (PandasArrowDataframeEncoder(), {"row_group_size": 10}),
+        (PandasArrowDataframeEncoder(), {}),
+        (ArrowIpcEncoder(), {}),
+    ],
+)
+@pytest.mark.parametrize(
+    "kwargs,expected",
+    [
+        ({"columns": ["a", "c"]}, lambda df: df[["a", "c"]]),
+        ({"head": 15}, lambda df: df.head(15)),
+        ({"head": 0}, lambda df: df.head(0)),
+        ({"head": 500}, lambda df: df),
+        ({"filters": [("a", ">=", 90)]}, lambda df: df[df.a >= 90].reset_index(drop=True)),
+        (
+            {"columns": ["b"], "filters": [("a", "<", 20)], "head": 5},
+            lambda df: df[["b"]].head(5),
+        ),
+    ],
+)
+def test_dataframe_projected_decode(wide_frame, encoder, options, kwargs, expected):
+    scrap = encoder.encode(Scrap("foo", wide_frame, encoder.name()), **options)
+    decoded = encoder.decode(scrap, **kwargs).data
+    pd.testing.assert_frame_equal(decoded, expected(wide_frame))
+    table = encoder.decode(scrap, as_arrow=True, **kwargs).data
+    pd.testing.assert_frame_equal(table.to_pandas(), expected(wide_frame))
+
+
+def test_parquet_head_reads_leading_row_groups(wide_frame):
+    scrap = PandasArrowDataframeEncoder().encode(Scrap("foo", wide_frame, "pandas"), row_group_size=10)
+    with mock.patch("pyarrow.parquet.read_table") as read_table:
+        with mock.patch("pyarrow.parquet.ParquetFile.read") as read:
+            decoded = PandasArrowDataframeEncoder().decode(scrap, head=5).data
+            # Batches are read from the leading row groups instead of the whole file
+            assert not read_table.called
+            assert not read.called
+    pd.testing.assert_frame_equal(decoded, wide_frame.head(5))
+
+
+def test_numpy_decode_head():
+    scrap = NumpyArrayEncoder().encode(Scrap("foo", np.arange(12).reshape(6, 2), "numpy"))
+    np.testing.assert_array_equal(NumpyArrayEncoder().decode(scrap, head=2).data, [[0, 1], [2, 3]])
+    scalar = full_registry.encode(Scrap("foo", np.array(5.0), "numpy"))
+    assert full_registry.decode(scalar, head=1).data == np.array(5.0)
+    assert full_registry.decode(scalar, head=1).data.ndim == 0
+
+
+def test_summarize_dataframe():
+    df = pd.DataFrame(
+        data={
+            "a": [1, 2, 3],
+            "b": [0.5, None, 1.5],
+            "c": ["x", "y", "z"],
+            "d": pd.to_datetime(["2020-01-01", "2020-01-02", None]),
+        }
+    )
+    summary = full_registry.encode(Scrap("foo", df, "pandas")).metadata["summary"]
+    assert summary["type"] == "dataframe"
+    assert summary["rows"] == 3
+    assert summary["nbytes"] > 0
+    assert summary["columns"] == [
+        {"name": "a", "type": "int64", "nulls": 0, "min": 1, "max": 3},
+        {"name": "b", "type": "float64", "nulls": 1, "min": 0.5, "max": 1.5},
+        {"name": "c", "type": "object", "nulls": 0},
+        {
+            "name": "d",
+            "type": "datetime64[ns]",
+            "nulls": 1,
+            "min": "2020-01-01T00:00:00",
+            "max": "2020-01-02T00:00:00",
+        },
+    ]
+    # Summaries are recorded as JSON
+    assert json.loads(json.dumps(summary)) == summary
+
+
+@pytest.mark.parametrize("data", [pyarrow.table({"a": [1, None, 3], "c": ["x", "y", "z"]})])
+def test_summarize_table(data):
+    summary = full_registry.encode(Scrap("foo", data, "arrow")).metadata["summary"]
+    assert summary["type"] == "table"
+    assert summary["rows"] == 3
+    assert summary["columns"] == [
+        {"name": "a", "type": "int64", "nulls": 1, "min": 1, "max": 3},
+        {"name": "c", "type": "string", "nulls": 0},
+    ]
+
+
+def test_summarize_array():
+    summary = full_registry.encode(Scrap("foo", np.arange(6.0).reshape(3, 2), "numpy")).metadata[
+        "summary"
+    ]
+    assert summary == {
+        "type": "ndarray",
+        "rows": 3,
+        "shape": [3, 2],
+        "dtype": "<f8",
+        "nbytes": 48,
+        "min": 0.0,
+        "max": 5.0,
+    }
+
+
+@pytest.mark.parametrize(
+    "data,encoder",
+    [
+        (pyarrow.table({"d": pyarrow.array([1, 2], pyarrow.duration("s"))}), "arrow"),
+        (pd.DataFrame({"d": pd.to_timedelta([1, 2], unit="s")}), "pandas"),
+        (np.array([1 + 2j, 3 - 1j]), "numpy"),
+        (np.array([1, 2], dtype="m8[s]"), "numpy"),
+    ],
+)
+def test_summaries_serialize(data, encoder):
+    scrap = full_registry.encode(Scrap("foo", data, encoder))
+    summary = scrap.metadata["summary"]
+    assert "min" not in summary and "min" not in summary.get("columns", [{}])[0]
+    json.dumps(scrap_to_payload(scrap))
+
+
+def test_summarize_nullable_nulls():
+    df = pd.DataFrame({"a": pd.array([None, 2], dtype="Int64")})
+    summary = full_registry.encode(Scrap("foo", df, "pandas")).metadata["summary"]
+    assert summary["columns"] == [{"name": "a", "type": "Int64", "nulls": 1, "min": 2, "max": 2}]
+    df = pd.DataFrame({"a": pd.array([None, None], dtype="Int64")})
+    scrap = full_registry.encode(Scrap("foo", df, "pandas"))
+    assert scrap.metadata["summary"]["columns"][0]["min"] is None
+    json.dumps(scrap_to_payload(scrap))
+
+
+@pytest.mark.parametrize(
+    "data,expected",
+    [
+        (np.array([np.nan, 1.0, 3.0]), (1.0, 3.0)),
+        (np.array([np.nan, np.nan]), (None, None)),
+        (np.array(["2020-01-01", "NaT"], dtype="M8[D]"), ("2020-01-01", "2020-01-01")),
+    ],
+)
+def test_summarize_array_nan(data, expected):
+    summary = full_registry.encode(Scrap("foo", data, "numpy")).metadata["summary"]
+    assert (summary["min"], summary["max"]) == expected
+
+
+class FailingSummaryEncoder(object):
+    def name(self):
+        return "failing"
+
+    def encodable(self, data):
+        return True
+
+    def encode(self, scrap, **kwargs):
+        return scrap
+
+    def decode(self, scrap, **kwargs):
+        return scrap
+
+    def summarize(self, data):
+        raise ValueError("can't summarize")
+
+
+def test_summarize_failure_keeps_glue():
+    registry = DataEncoderRegistry()
+    registry.register(FailingSummaryEncoder())
+    scrap = registry.encode(Scrap("foo", "bar", "failing"))
+    assert scrap == Scrap("foo", "bar", "failing")
+
+
+def test_summarize_json_threshold():
+    assert full_registry.encode(Scrap("foo", [1, 2], "json")).metadata is None
+    assert full_registry.encode(Scrap("foo", ["a" * 2 ** 17], "json")).metadata is None
+    large = list(range(JsonEncoder.SUMMARY_THRESHOLD + 1))
+    summary = full_registry.encode(Scrap("foo", large, "json")).metadata["summary"]
+    assert summary["type"] == "list"
+    assert summary["length"] == len(large)
+    assert summary["nbytes"] == len(json.dumps(large))
+
+
+def test_encode_without_summary():
+    df = pd.DataFrame(data={"a": [1]})
+    assert full_registry.encode(Scrap("foo", df, "pandas"), summarize=False).metadata is None
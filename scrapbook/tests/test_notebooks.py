@@ -5,6 +5,8 @@ import pytest
 import collections
 import json
 
+import pyarrow
+import numpy as np
 import pandas as pd
 
 from pandas.util.testing import assert_frame_equal
@@ -13,6 +15,8 @@ from nbformat.v4 import new_notebook, new_code_cell, new_markdown_cell, new_outp
 from . import get_notebook_path, get_notebook_dir
 from .. import read_notebook, utils
 from ..models import Notebook
+from ..scraps import Scrap, Scraps
+from ..encoders import registry as encoder_registry
 from ..exceptions import ScrapbookException
 
 try:
@@ -250,6 +254,27 @@ def test_papermill_metrics(notebook_result):
     assert_frame_equal(notebook_result.papermill_metrics, expected_df)
 
 
+def test_metrics_papermill_times():
+    cells = [
+        new_code_cell("", execution_count=3),
+        new_code_cell(""),
+        new_code_cell("", execution_count=4),
+    ]
+    cells[0].metadata["papermill"] = {
+        "duration": 1.5,
+        "start_time": "2020-01-01T00:00:00.000000",
+        "end_time": "2020-01-01T00:00:01.500000",
+    }
+    cells[2].metadata["papermill"] = {"duration": None}
+    metrics = Notebook(new_notebook(cells=cells)).metrics
+    assert list(metrics.cell_index) == [0, 2]
+    assert list(metrics.execution_count) == [3, 4]
+    assert metrics.duration[0] == 1.5
+    assert np.isnan(metrics.duration[1])
+    assert metrics.end_time[0] - metrics.start_time[0] == pd.Timedelta(seconds=1.5)
+    assert pd.isnull(metrics.start_time[1])
+
+
 def test_malformed_execution_metrics(no_exec_result):
     expected_df = pd.DataFrame([], columns=["filename", "cell", "value", "type"])
     assert_frame_equal(no_exec_result.papermill_metrics, expected_df)
@@ -328,3 +353,114 @@ def test_reglue_kernel_no_warning(kernel_mock, notebook_result, recwarn):
     kernel_mock.return_value = True
     notebook_result.reglue('number')
     assert len(recwarn) == 0
+
+
+@mock.patch("scrapbook.encoders.registry.decode")
+def test_scraps_decode_on_access(mock_decode, notebook_result):
+    mock_decode.side_effect = lambda scrap, **kwargs: scrap
+    assert list(notebook_result.scraps.keys()) == [
+        "one",
+        "number",
+        "list",
+        "dict",
+        "output",
+        "one_only",
+    ]
+    assert not mock_decode.called
+    assert notebook_result.scraps["list"].data == [1, 2, 3]
+    mock_decode.assert_called_once()
+
+
+def test_trusted_scraps(notebook_result):
+    trusted = read_notebook(get_notebook_path("collection/result1.ipynb"), trusted=True)
+    assert trusted.scraps == notebook_result.scraps
+
+
+def test_scrap_projection():
+    nb = read_notebook(get_notebook_path("collection/result1.ipynb"), scraps=["list", "output"])
+    assert list(nb.scraps) == ["list", "output"]
+    assert nb.scraps["list"].data == [1, 2, 3]
+    assert nb.scraps["output"].display["data"] == {"text/plain": "'Hello World!'"}
+
+
+def test_scrap_projection_single_name(notebook_backwards_result):
+    nb = read_notebook(get_notebook_path("record.ipynb"), scraps="some_display")
+    assert nb.scraps == Scraps([("some_display", notebook_backwards_result.scraps["some_display"])])
+
+
+@mock.patch("scrapbook.models.payload_to_scrap")
+def test_scrap_projection_skips_validation(mock_payload_to_scrap):
+    mock_payload_to_scrap.side_effect = lambda payload, **kwargs: Scrap(
+        payload["name"], payload["data"], payload["encoder"]
+    )
+    nb = read_notebook(get_notebook_path("collection/result1.ipynb"), scraps=["dict"])
+    assert nb.scraps["dict"].data == {"a": 1, "b": 2}
+    mock_payload_to_scrap.assert_called_once()
+
+
+def _glue_output(name, data, encoder="json"):
+    return new_output(
+        output_type="display_data",
+        data={
+            "application/scrapbook.scrap.{}+json".format(encoder): {
+                "name": name,
+                "data": data,
+                "encoder": encoder,
+                "version": 1,
+            }
+        },
+        metadata={"scrapbook": {"name": name, "data": True, "display": False}},
+    )
+
+
+@pytest.fixture
+def long_notebook():
+    cells = [new_code_cell("glue", outputs=[_glue_output("step", i)]) for i in range(50)]
+    cells.append(
+        new_code_cell("summary", outputs=[_glue_output("summary", "done"), _glue_output("step", 99)])
+    )
+    return new_notebook(cells=cells)
+
+
+def test_named_scraps_last_output_wins(long_notebook):
+    nb = Notebook(long_notebook, scraps=["summary", "step"])
+    assert nb.scraps == Scraps(
+        [
+            ("summary", Scrap("summary", "done", "json")),
+            ("step", Scrap("step", 99, "json")),
+        ]
+    )
+
+
+def test_named_scraps_stop_early(long_notebook):
+    nb = Notebook(long_notebook, scraps=["step", "summary"])
+    with mock.patch.object(
+        nb, "_extract_output_scraps", wraps=nb._extract_output_scraps
+    ) as mock_extract:
+        assert list(nb.scraps) == ["step", "summary"]
+    assert mock_extract.call_count == 2
+
+
+def test_named_scraps_missing_name(long_notebook):
+    nb = Notebook(long_notebook, scraps=["step", "missing"])
+    assert list(nb.scraps) == ["step"]
+    assert nb.scraps["step"].data == 99
+
+
+def test_notebook_as_arrow():
+    df = pd.DataFrame(data={"foo": [1, 2], "bar": ["a", "b"]})
+    encoded = encoder_registry.encode(Scrap("df", df, "pandas"))
+    outputs = [_glue_output("df", encoded.data, "pandas"), _glue_output("n", 1)]
+    nb = Notebook(new_notebook(cells=[new_code_cell("glue", outputs=outputs)]), as_arrow=True)
+    for notebook in [nb, nb.copy()]:
+        assert isinstance(notebook.scraps["df"].data, pyarrow.Table)
+        assert notebook.scraps["n"].data == 1
+    assert_frame_equal(nb.scraps["df"].data.to_pandas(), df)
+
+
+def test_scraps_validated_once():
+    nb = Notebook(new_notebook(cells=[new_code_cell("", outputs=[_glue_output("foo", [1, 2])])]))
+    with mock.patch("scrapbook.scraps.scrap_validator") as mock_validator:
+        assert nb.scraps["foo"].data == [1, 2]
+        # Validated when extracted, and not again when decoded
+        assert mock_validator.return_value.validate.call_count == 1
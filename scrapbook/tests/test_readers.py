@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import json
+import mock
+import pytest
+import nbformat
+
+from nbformat.v4 import new_notebook, new_code_cell, new_output
+
+from . import get_notebook_path
+from .. import read_notebook, readers
+from ..readers import read_scrap_node, reads_node, read_notebook_metadata
+
+
+@pytest.fixture
+def large_output_notebook(tmpdir):
+    outputs = [
+        new_output(output_type="display_data", data={"image/png": "A" * 100000}, metadata={}),
+        new_output(output_type="stream", name="stdout", text="noise\n" * 1000),
+        new_output(
+            output_type="display_data",
+            data={
+                "application/scrapbook.scrap.json+json": {
+                    "name": "kept",
+                    "data": [1, 2],
+                    "encoder": "json",
+                    "version": 1,
+                }
+            },
+            metadata={"scrapbook": {"name": "kept", "data": True, "display": False}},
+        ),
+        new_output(
+            output_type="display_data",
+            data={"text/plain": "'shown'"},
+            metadata={"scrapbook": {"name": "kept", "data": False, "display": True}},
+        ),
+    ]
+    nb = new_notebook(cells=[new_code_cell("print('hi')", outputs=outputs, execution_count=1)])
+    nb.metadata["papermill"] = {"parameters": {"foo": 1.5}}
+    path = str(tmpdir.join("large.ipynb"))
+    with open(path, "w") as f:
+        json.dump(nb, f, sort_keys=True)
+    return path
+
+
+@pytest.mark.parametrize("name", ["collection/result1.ipynb", "record.ipynb"])
+def test_streaming_matches_full_read(name):
+    full = read_notebook(get_notebook_path(name))
+    streamed = read_notebook(get_notebook_path(name), streaming=True)
+    assert streamed.scraps == full.scraps
+    assert streamed.parameters == full.parameters
+    assert streamed.cell_timing == full.cell_timing
+    assert streamed.execution_counts == full.execution_counts
+
+
+def test_streaming_drops_non_scrap_outputs(large_output_notebook):
+    node = read_scrap_node(large_output_notebook)
+    assert node.metadata.papermill.parameters == {"foo": 1.5}
+    outputs = node.cells[0].outputs
+    assert len(outputs) == 2
+    assert "source" not in node.cells[0]
+    assert list(outputs[0].data) == ["application/scrapbook.scrap.json+json"]
+    assert outputs[1].data == {"text/plain": "'shown'"}
+
+
+def test_streaming_skips_non_display_bundles(large_output_notebook):
+    with mock.patch("scrapbook.readers._build", wraps=readers._build) as mock_build:
+        read_scrap_node(large_output_notebook)
+    # The large image of an output which isn't a display is never built
+    assert "A" * 100000 not in [call[0][2] for call in mock_build.call_args_list]
+
+
+def test_streaming_scraps(large_output_notebook):
+    nb = read_notebook(large_output_notebook, streaming=True)
+    assert nb.scraps["kept"].display["data"] == {"text/plain": "'shown'"}
+
+
+@pytest.mark.parametrize("validate", [True, False])
+def test_reads_node_matches_nbformat(validate):
+    with open(get_notebook_path("record.ipynb")) as f:
+        text = f.read()
+    assert reads_node(text, validate=validate) == nbformat.reads(text, as_version=4)
+
+
+def test_reads_node_skips_validation():
+    with open(get_notebook_path("record.ipynb")) as f:
+        text = f.read()
+    with mock.patch("scrapbook.readers.nbformat.validate") as mock_validate:
+        reads_node(text, validate=False)
+        assert not mock_validate.called
+        reads_node(text)
+        assert mock_validate.called
+
+
+def test_reads_node_not_json():
+    with pytest.raises(nbformat.reader.NotJSONError):
+        reads_node("not a notebook")
+
+
+def test_read_notebook_without_validation():
+    nb = read_notebook(get_notebook_path("record.ipynb"), validate=False)
+    assert nb.scraps == read_notebook(get_notebook_path("record.ipynb")).scraps
+
+
+def test_read_notebook_metadata(large_output_notebook):
+    with mock.patch("ijson.items") as mock_items:
+        metadata = read_notebook_metadata(large_output_notebook)
+        # Found at the end of the file without streaming it
+        assert not mock_items.called
+    assert metadata.papermill.parameters == {"foo": 1.5}
+
+
+def test_read_notebook_metadata_nested_candidates(tmpdir):
+    # Cell metadata after the notebook metadata only appears in unsorted notebooks
+    nb = {
+        "metadata": {"papermill": {"parameters": {"metadata": "x"}}},
+        "cells": [{"cell_type": "markdown", "metadata": {"a": 1}, "source": ""}],
+        "nbformat": 4,
+        "nbformat_minor": 4,
+    }
+    path = str(tmpdir.join("unsorted.ipynb"))
+    with open(path, "w") as f:
+        json.dump(nb, f)
+    assert read_notebook_metadata(path) == nb["metadata"]
+
+
+@mock.patch("scrapbook.readers._read_tail_metadata")
+def test_read_notebook_metadata_streams(mock_tail, large_output_notebook):
+    # Metadata which isn't in the tail of the file is streamed instead
+    mock_tail.return_value = None
+    metadata = read_notebook_metadata(large_output_notebook)
+    assert metadata.papermill.parameters == {"foo": 1.5}
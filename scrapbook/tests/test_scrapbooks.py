@@ -2,16 +2,23 @@
 # -*- coding: utf-8 -*-
 import six
 import mock
+import shutil
 import pytest
 
+import pyarrow
 import pandas as pd
 
 from collections import OrderedDict
 from IPython.display import Markdown
+from nbformat.v4 import new_notebook, new_code_cell, new_output
 from pandas.util.testing import assert_frame_equal
 
 from . import get_notebook_path
 from .. import read_notebooks, utils
+from ..models import Notebook, Scrapbook, read_parameters
+from ..encoders import registry as encoder_registry
+from ..scraps import scrap_to_payload
+from ..exceptions import ScrapbookException
 from ..scraps import Scrap, Scraps
 
 
@@ -36,6 +43,140 @@ def notebook_collection():
     return read_notebooks(path)
 
 
+@pytest.mark.parametrize("executor", ["thread", "process"])
+def test_read_notebooks_concurrently(notebook_collection, executor):
+    book = read_notebooks(get_notebook_path("collection"), workers=2, executor=executor)
+    assert list(book) == ["result1", "result2"]
+    assert book.notebook_scraps == notebook_collection.notebook_scraps
+
+
+def test_read_notebooks_decode(notebook_collection):
+    book = read_notebooks(get_notebook_path("collection"), workers=2, decode=True)
+    assert all(
+        scrap.decoded for nb in book.notebooks for scrap in nb.scraps.data_scraps.values()
+    )
+    assert book.scraps == notebook_collection.scraps
+
+
+def test_lazy_read_notebooks(notebook_collection):
+    book = read_notebooks(get_notebook_path("collection"), lazy=True)
+    assert list(book) == ["result1", "result2"]
+    assert len(book) == 2
+    assert not book.is_loaded("result1") and not book.is_loaded("result2")
+    assert book["result2"].scraps == notebook_collection["result2"].scraps
+    assert not book.is_loaded("result1") and book.is_loaded("result2")
+    assert book.scraps == notebook_collection.scraps
+
+
+def test_lazy_eviction(notebook_collection):
+    book = read_notebooks(get_notebook_path("collection"), lazy=True, max_loaded=1)
+    assert book.notebook_scraps == notebook_collection.notebook_scraps
+    assert not book.is_loaded("result1") and book.is_loaded("result2")
+    book["result1"]
+    assert book.is_loaded("result1") and not book.is_loaded("result2")
+
+
+def test_lazy_contains(notebook_collection):
+    book = read_notebooks(get_notebook_path("collection"), lazy=True, max_loaded=1)
+    book["result2"]
+    assert "result1" in book
+    assert "missing" not in book
+    assert not book.is_loaded("result1")
+    assert book.is_loaded("result2")
+
+
+def test_lazy_assign_from_path():
+    book = Scrapbook(lazy=True)
+    book["result_no_exec"] = get_notebook_path("result_no_exec.ipynb")
+    assert not book.is_loaded("result_no_exec")
+    assert book["result_no_exec"].execution_counts == [None]
+    del book["result_no_exec"]
+    assert len(book) == 0
+
+
+@pytest.fixture
+def collection_dir(tmpdir):
+    for name in ["result1", "result2"]:
+        shutil.copy(get_notebook_path("collection", name + ".ipynb"), str(tmpdir))
+    return tmpdir
+
+
+def test_refresh(collection_dir):
+    book = read_notebooks(str(collection_dir))
+    result1 = book["result1"]
+    collection_dir.join("result2.ipynb").remove()
+    shutil.copy(get_notebook_path("result_no_exec.ipynb"), str(collection_dir))
+    assert book.refresh() is book
+    assert list(book) == ["result1", "result_no_exec"]
+    assert book["result1"] is result1
+
+
+def test_refresh_modified(collection_dir):
+    book = read_notebooks(str(collection_dir))
+    result1 = book["result1"]
+    notebook = collection_dir.join("result1.ipynb")
+    notebook.write(notebook.read().replace('"hello"', '"changed"'))
+    book.refresh()
+    assert book["result1"] is not result1
+    assert book["result1"].parameters["bar"] == "changed"
+
+
+def test_refresh_keeps_assigned(collection_dir):
+    book = read_notebooks(str(collection_dir), lazy=True)
+    book["extra"] = get_notebook_path("result_no_exec.ipynb")
+    collection_dir.join("result1.ipynb").remove()
+    book.refresh()
+    assert list(book) == ["result2", "extra"]
+
+
+def test_read_notebooks_previous(collection_dir):
+    book = read_notebooks(str(collection_dir))
+    shutil.copy(get_notebook_path("result_no_exec.ipynb"), str(collection_dir))
+    with mock.patch("scrapbook.api.read_notebook") as mock_read:
+        updated = read_notebooks(str(collection_dir), previous=book)
+        mock_read.assert_called_once_with(str(collection_dir.join("result_no_exec.ipynb")))
+    assert list(updated) == ["result1", "result2", "result_no_exec"]
+    assert list(book) == ["result1", "result2"]
+    assert updated["result1"] is book["result1"]
+
+
+@pytest.mark.parametrize(
+    "where,expected",
+    [
+        ({"foo": 2}, ["result2"]),
+        ({"bar": "hello", "foo": 2}, []),
+        (lambda parameters: parameters["foo"] < 3, ["result1", "result2"]),
+    ],
+)
+def test_read_notebooks_where(collection_dir, where, expected):
+    with mock.patch("scrapbook.api.Notebook", wraps=Notebook) as mock_notebook:
+        book = read_notebooks(str(collection_dir), where=where)
+        # Only matching notebooks are fully read
+        assert mock_notebook.call_count == len(expected)
+    assert list(book) == expected
+
+
+def test_read_notebooks_where_refresh(collection_dir):
+    book = read_notebooks(str(collection_dir), where={"foo": 2}, lazy=True)
+    shutil.copy(str(collection_dir.join("result2.ipynb")), str(collection_dir.join("result3.ipynb")))
+    assert list(book.refresh()) == ["result2", "result3"]
+    # The parameters were learned from the metadata reads
+    assert list(book.parameter_index.foo) == [2, 2]
+    assert not book.is_loaded("result2")
+
+
+def test_refresh_requires_listing():
+    with pytest.raises(ScrapbookException):
+        Scrapbook().refresh()
+
+
+def test_read_notebooks_scrap_projection():
+    book = read_notebooks(get_notebook_path("collection"), scraps=["number"])
+    assert book.scraps == Scraps(
+        [("number", Scrap(name="number", data=2, encoder="json", display=None))]
+    )
+
+
 def test_assign_from_path(notebook_collection):
     notebook_collection["result_no_exec.ipynb"] = get_notebook_path("result_no_exec.ipynb")
 
@@ -208,6 +349,44 @@ def test_scraps(notebook_collection):
     )
 
 
+def test_scraps_table(notebook_collection):
+    expected_df = pd.DataFrame(
+        {
+            "bar": ["hello", "world"],
+            "foo": [1, 2],
+            "one": [1.0, None],
+            "number": [1, 2],
+            "two": [None, 2.0],
+        },
+        index=pd.Index(["result1", "result2"], name="key"),
+    )
+    assert_frame_equal(notebook_collection.scraps_table(), expected_df)
+
+
+def test_scraps_table_names(notebook_collection):
+    expected_df = pd.DataFrame(
+        {"list": [[1, 2, 3], [4, 5, 6]], "number": [1, 2]},
+        index=pd.Index(["result1", "result2"], name="key"),
+    )
+    assert_frame_equal(
+        notebook_collection.scraps_table(["list", "number"], include_parameters=False), expected_df
+    )
+
+
+def test_scraps_table_keeps_parameters(sweep):
+    sweep["run4"] = _sweep_notebook({"alpha": 0.3}, alpha=([1, 2], "json"))
+    sweep["run5"] = _sweep_notebook({"alpha": 0.4}, model=("lgbm", "text"))
+    table = sweep.scraps_table()
+    # The non-scalar "alpha" scrap is dropped, leaving the parameter
+    assert list(table.alpha) == [0.1, 0.2, 0.1, 0.3, 0.4]
+    # Scraps take precedence over parameters of the same name
+    assert list(table.model) == ["xgb", "xgb", None, None, "lgbm"]
+
+
+def test_scraps_table_empty():
+    assert Scrapbook().scraps_table().empty
+
+
 def test_papermill_metrics(notebook_collection):
     expected_df = pd.DataFrame(
         [
@@ -221,6 +400,173 @@ def test_papermill_metrics(notebook_collection):
     assert_frame_equal(notebook_collection.papermill_metrics, expected_df)
 
 
+def test_metrics(notebook_collection):
+    expected_df = pd.DataFrame(
+        {
+            "filename": ["result1.ipynb", "result1.ipynb", "result2.ipynb", "result2.ipynb"],
+            "cell_index": [0, 1, 0, 1],
+            "execution_count": [1, 2, 1, 2],
+            "duration": [0.0, 0.123, 0.0, 0.456],
+            "start_time": pd.to_datetime([None] * 4),
+            "end_time": pd.to_datetime([None] * 4),
+            "key": ["result1", "result1", "result2", "result2"],
+        }
+    )
+    assert_frame_equal(notebook_collection.metrics, expected_df)
+
+
+def test_metrics_empty():
+    assert list(Scrapbook().metrics.columns) == [
+        "filename",
+        "cell_index",
+        "execution_count",
+        "duration",
+        "start_time",
+        "end_time",
+        "key",
+    ]
+
+
+def _sweep_notebook(parameters, **scraps):
+    outputs = []
+    for name, (data, encoder) in scraps.items():
+        payload = scrap_to_payload(encoder_registry.encode(Scrap(name, data, encoder)))
+        outputs.append(
+            new_output(
+                output_type="display_data",
+                data={"application/scrapbook.scrap.{}+json".format(encoder): payload},
+                metadata={"scrapbook": {"name": name, "data": True, "display": False}},
+            )
+        )
+    return Notebook(
+        new_notebook(
+            cells=[new_code_cell("", outputs=outputs)],
+            metadata={"papermill": {"parameters": parameters}},
+        )
+    )
+
+
+@pytest.fixture
+def sweep():
+    book = Scrapbook()
+    book["run1"] = _sweep_notebook(
+        {"alpha": 0.1, "model": "xgb"},
+        results=(pd.DataFrame({"step": [1, 2], "loss": [0.5, 0.25]}), "pandas"),
+    )
+    book["run2"] = _sweep_notebook(
+        {"alpha": 0.2, "model": "xgb", "tags": ["x"], "grid": {"a": 1}}, score=(1, "json")
+    )
+    book["run3"] = _sweep_notebook(
+        {"alpha": 0.1},
+        results=(pyarrow.table({"step": [1], "loss": [0.75], "note": ["x"]}), "arrow"),
+    )
+    return book
+
+
+@pytest.mark.parametrize("workers", [None, 2])
+def test_concat_scrap(sweep, workers):
+    table = sweep.concat_scrap("results", workers=workers)
+    assert table.column_names == ["notebook", "alpha", "model", "step", "loss", "note"]
+    assert pyarrow.types.is_dictionary(table.schema.field("notebook").type)
+    assert pyarrow.types.is_dictionary(table.schema.field("alpha").type)
+    assert table.column("notebook").to_pylist() == ["run1", "run1", "run3"]
+    assert table.column("alpha").to_pylist() == [0.1, 0.1, 0.1]
+    assert table.column("model").to_pylist() == ["xgb", "xgb", None]
+    assert table.column("loss").to_pylist() == [0.5, 0.25, 0.75]
+    assert table.column("note").to_pylist() == [None, None, "x"]
+    # Scraps were decoded to Arrow rather than to their glued type
+    assert not sweep["run1"].scraps["results"].decoded
+
+
+def test_concat_scrap_without_extra_columns(sweep):
+    table = sweep.concat_scrap("results", key_column=None, include_parameters=False)
+    assert table.column_names == ["step", "loss", "note"]
+    assert table.num_rows == 3
+
+
+def test_concat_scrap_missing(sweep):
+    assert sweep.concat_scrap("missing").num_rows == 0
+
+
+def test_concat_scrap_column_conflict(sweep):
+    with pytest.raises(ScrapbookException):
+        sweep.concat_scrap("results", key_column="step")
+
+
+def test_concat_scrap_not_tabular(sweep):
+    with pytest.raises(ScrapbookException):
+        sweep.concat_scrap("score")
+
+
+def test_parameter_index(sweep):
+    expected_df = pd.DataFrame(
+        {
+            "alpha": [0.1, 0.2, 0.1],
+            "model": ["xgb", "xgb", None],
+            "grid": [None, {"a": 1}, None],
+            "tags": [None, ["x"], None],
+        },
+        index=pd.Index(["run1", "run2", "run3"], name="key"),
+    )
+    assert_frame_equal(sweep.parameter_index, expected_df)
+    assert sweep.parameter_index is sweep.parameter_index
+
+
+def test_parameter_index_updates(sweep):
+    sweep.parameter_index
+    sweep["run4"] = _sweep_notebook({"alpha": 0.3})
+    del sweep["run1"]
+    assert list(sweep.parameter_index.index) == ["run2", "run3", "run4"]
+    assert list(sweep.parameter_index.alpha) == [0.2, 0.1, 0.3]
+
+
+@pytest.mark.parametrize(
+    "expr,parameters,expected",
+    [
+        (None, {"alpha": 0.1}, ["run1", "run3"]),
+        (None, {"alpha": 0.1, "model": "xgb"}, ["run1"]),
+        (None, {"unknown": 1}, []),
+        (None, {"tags": ["x"]}, ["run2"]),
+        (None, {"grid": {"a": 1}, "model": "xgb"}, ["run2"]),
+        ("alpha > 0.1", {}, ["run2"]),
+        ("model in ['xgb', 'lgbm']", {"alpha": 0.2}, ["run2"]),
+    ],
+)
+def test_where(sweep, expr, parameters, expected):
+    selected = sweep.where(expr, **parameters)
+    assert isinstance(selected, Scrapbook)
+    assert list(selected) == expected
+    for key in expected:
+        assert selected[key] is sweep[key]
+
+
+def test_where_uses_index_for_scalars(sweep):
+    sweep.parameter_index
+    with mock.patch("scrapbook.models.parameters_match") as mock_match:
+        assert list(sweep.where(alpha=0.1, model="xgb")) == ["run1"]
+        assert not mock_match.called
+        mock_match.return_value = True
+        # Only notebooks matching the scalar filters are compared by value
+        assert list(sweep.where(tags=["x"], alpha=0.2)) == ["run2"]
+        assert mock_match.call_count == 1
+
+
+def test_where_skips_scraps(sweep):
+    with mock.patch.object(Notebook, "_fetch_scraps") as mock_fetch:
+        assert list(sweep.where(model="xgb")) == ["run1", "run2"]
+        assert not mock_fetch.called
+
+
+def test_where_lazy(collection_dir):
+    book = read_notebooks(str(collection_dir), lazy=True, max_loaded=1)
+    selected = book.where(foo=2)
+    # The parameter index only read the notebooks' metadata
+    assert not any(book.is_loaded(key) for key in book)
+    assert selected.lazy
+    assert list(selected) == ["result2"]
+    assert selected["result2"].parameters == {"bar": "world", "foo": 2}
+
+
 def test_papermill_dataframe(notebook_collection):
     expected_df = pd.DataFrame(
         [
@@ -388,3 +734,21 @@ def test_scraps_report_with_scrap_and_notebook_names(mock_display, notebook_coll
             mock.call({"text/plain": "'Hello World!'"}, metadata={}, raw=True),
         ]
     )
+
+
+def test_read_notebooks_where_refresh_unchanged(collection_dir):
+    book = read_notebooks(str(collection_dir), where={"foo": 2}, lazy=True)
+    with mock.patch("scrapbook.models.read_parameters", wraps=read_parameters) as mock_read:
+        assert list(book.refresh()) == ["result2"]
+        # Neither the selected nor the excluded notebooks are read again
+        assert not mock_read.called
+        notebook = collection_dir.join("result1.ipynb")
+        notebook.write(notebook.read().replace('"foo": 1', '"foo": 2'))
+        assert list(book.refresh()) == ["result1", "result2"]
+        mock_read.assert_called_once_with(str(notebook))
+
+
+def test_read_notebooks_previous_other_where(collection_dir):
+    book = read_notebooks(str(collection_dir), where={"foo": 2})
+    updated = read_notebooks(str(collection_dir), where={"foo": 1}, previous=book)
+    assert list(updated) == ["result1"]
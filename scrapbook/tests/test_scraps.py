@@ -1,10 +1,11 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 import mock
+import pickle
 import pytest
 
-from ..scraps import Scrap, scrap_to_payload, payload_to_scrap
-from ..schemas import LATEST_SCRAP_VERSION
+from ..scraps import Scrap, Scraps, LazyScrap, scrap_to_payload, payload_to_scrap
+from ..schemas import LATEST_SCRAP_VERSION, scrap_validator
 from ..exceptions import ScrapbookDataException
 
 
@@ -135,6 +136,37 @@ def test_payload_to_scrap_validation_error(test_input):
         payload_to_scrap(test_input)
 
 
+def test_scrap_validator_cached():
+    assert scrap_validator(LATEST_SCRAP_VERSION) is scrap_validator(LATEST_SCRAP_VERSION)
+
+
+def test_scrap_validator_missing_version():
+    with pytest.raises(ValueError):
+        scrap_validator(LATEST_SCRAP_VERSION + 100)
+
+
+@mock.patch("scrapbook.scraps.scrap_validator")
+def test_trusted_payload_skips_schema(mock_validator):
+    payload = {"name": "foo", "data": [1, 2], "encoder": "json", "version": LATEST_SCRAP_VERSION}
+    assert payload_to_scrap(payload, trusted=True) == Scrap(name="foo", data=[1, 2], encoder="json")
+    assert scrap_to_payload(Scrap(name="foo", data=[1, 2], encoder="json"), trusted=True) == payload
+    assert not mock_validator.called
+
+
+@pytest.mark.parametrize(
+    "test_input",
+    [
+        {"name": None, "data": [1], "encoder": "json", "version": LATEST_SCRAP_VERSION},
+        {"name": "foo", "data": [1], "encoder": 1, "version": LATEST_SCRAP_VERSION},
+        {"name": "foo", "data": None, "encoder": "json", "version": LATEST_SCRAP_VERSION},
+        {"name": "foo", "encoder": "json", "version": LATEST_SCRAP_VERSION},
+    ],
+)
+def test_trusted_payload_envelope_errors(test_input):
+    with pytest.raises(ScrapbookDataException):
+        payload_to_scrap(test_input, trusted=True)
+
+
 @mock.patch("scrapbook.scraps.logger")
 def test_payload_to_scrap_later_version(mock_logging):
     assert payload_to_scrap(
@@ -162,3 +194,103 @@ def test_payload_to_scrap_later_version_mismatch(mock_logging):
     ) == Scrap(name=None, data=None, encoder=None)
     # Should emit a warning that it might not be able to parse the payload
     assert mock_logging.warning.called
+
+
+@mock.patch("scrapbook.encoders.registry.decode")
+def test_lazy_scrap_decodes_once(mock_decode):
+    mock_decode.return_value = Scrap(name="foo", data={"foo": "bar"}, encoder="json")
+    scrap = LazyScrap(name="foo", data='{"foo": "bar"}', encoder="json")
+    assert not mock_decode.called
+    assert not scrap.decoded
+    assert scrap.data == {"foo": "bar"}
+    assert scrap.data == {"foo": "bar"}
+    assert scrap.raw_data == '{"foo": "bar"}'
+    mock_decode.assert_called_once_with(Scrap(name="foo", data='{"foo": "bar"}', encoder="json"))
+
+
+def test_scrap_metadata_round_trip():
+    scrap = Scrap(name="foo", data="bar", encoder="text", metadata={"options": {"a": 1}})
+    payload = scrap_to_payload(scrap)
+    assert payload["metadata"] == {"options": {"a": 1}}
+    assert payload_to_scrap(payload) == scrap
+    assert payload_to_scrap(payload, trusted=True) == scrap
+
+
+def test_trusted_payload_metadata_error():
+    with pytest.raises(ScrapbookDataException):
+        payload_to_scrap(
+            {"name": "foo", "data": "bar", "encoder": "text", "version": 1, "metadata": []},
+            trusted=True,
+        )
+
+
+@mock.patch("scrapbook.encoders.registry.decode")
+def test_lazy_scrap_load(mock_decode):
+    mock_decode.return_value = Scrap(name="foo", data="projected", encoder="pandas")
+    scrap = LazyScrap(name="foo", data="raw", encoder="pandas", trusted=True)
+    assert scrap.load(columns=["a"], head=5) == "projected"
+    mock_decode.assert_called_once_with(
+        Scrap(name="foo", data="raw", encoder="pandas"), trusted=True, columns=["a"], head=5
+    )
+    # Projections aren't memoized as the scrap's data
+    assert not scrap.decoded
+
+
+def test_scraps_describe():
+    summary = {"type": "dataframe", "rows": 2, "nbytes": 10, "columns": []}
+    scraps = Scraps(
+        [
+            ("df", LazyScrap("df", "raw", "pandas", metadata={"summary": summary})),
+            ("n", LazyScrap("n", 1, "json")),
+            ("shown", Scrap("shown", None, "display", {"data": {}})),
+        ]
+    )
+    with mock.patch("scrapbook.encoders.registry.decode") as mock_decode:
+        described = scraps.describe()
+        assert not mock_decode.called
+    assert list(described.columns) == ["name", "encoder", "type", "rows", "nbytes", "summary"]
+    assert list(described.name) == ["df", "n", "shown"]
+    assert described.summary[0] == summary
+    assert described.rows[0] == 2
+    assert described.summary[1] is None
+
+
+def test_lazy_scrap_equality():
+    scrap = LazyScrap(name="foo", data='["bar"]', encoder="json")
+    assert scrap == Scrap(name="foo", data=["bar"], encoder="json")
+    assert Scrap(name="foo", data=["bar"], encoder="json") == scrap
+    assert scrap != Scrap(name="foo", data='["bar"]', encoder="json")
+    assert tuple(scrap) == ("foo", ["bar"], "json", None, None)
+
+
+def test_lazy_scrap_replace_stays_lazy():
+    scrap = LazyScrap(name="foo", data='["bar"]', encoder="json")._replace(display={"a": 1})
+    assert isinstance(scrap, LazyScrap)
+    assert not scrap.decoded
+    assert scrap == Scrap(name="foo", data=["bar"], encoder="json", display={"a": 1})
+    assert scrap._replace(data=1) == Scrap(name="foo", data=1, encoder="json", display={"a": 1})
+
+
+def test_lazy_scrap_pickle_stays_lazy():
+    scrap = pickle.loads(pickle.dumps(LazyScrap(name="foo", data='["bar"]', encoder="json")))
+    assert isinstance(scrap, LazyScrap)
+    assert not scrap.decoded
+    assert scrap.data == ["bar"]
+
+
+def test_lazy_scrap_payload_uses_raw_data():
+    scrap = LazyScrap(name="foo", data='{"foo": "bar"}', encoder="json")
+    assert scrap_to_payload(scrap)["data"] == '{"foo": "bar"}'
+    assert not scrap.decoded
+
+
+def test_data_scraps_do_not_decode():
+    scraps = Scraps(
+        [
+            ("foo", LazyScrap(name="foo", data='["bar"]', encoder="json")),
+            ("baz", Scrap(name="baz", data=None, encoder="display", display={})),
+        ]
+    )
+    assert list(scraps.data_scraps) == ["foo"]
+    assert list(scraps.display_scraps) == ["baz"]
+    assert not scraps["foo"].decoded
@@ -1,9 +1,22 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 import sys
+import mock
+import base64
+import binascii
+import pytest
 
 from mock import MagicMock
-from ..utils import is_kernel
+from .. import utils
+from ..utils import (
+    is_kernel,
+    concurrent_map,
+    json_loads,
+    set_json_backend,
+    b64encode_chunked,
+    b64decode_chunked,
+)
+from ..exceptions import ScrapbookException
 
 
 def test_is_kernel_true():
@@ -21,3 +34,71 @@ def test_not_kernel_in_ipython():
     sys.modules['IPython'].get_ipython.return_value = {}
     assert not is_kernel()
     del sys.modules['IPython']
+
+
+@pytest.mark.parametrize("workers", [None, 1, 4])
+@pytest.mark.parametrize("executor", ["thread", "process"])
+def test_concurrent_map_preserves_order(workers, executor):
+    assert concurrent_map(abs, range(-20, 0), workers, executor) == list(range(20, 0, -1))
+
+
+def test_concurrent_map_unknown_executor():
+    with pytest.raises(ScrapbookException):
+        concurrent_map(abs, [1, 2], 2, "fiber")
+
+
+@pytest.fixture
+def json_backend():
+    backend = utils.json_backend
+    yield
+    utils.json_backend = backend
+
+
+@pytest.mark.parametrize("backend", ["orjson", "json"])
+def test_json_loads(json_backend, backend):
+    set_json_backend(backend)
+    assert json_loads('{"a": [1, 2.5, "b"]}') == {"a": [1, 2.5, "b"]}
+    assert json_loads(b'[true, null]') == [True, None]
+
+
+def test_json_loads_falls_back_to_stdlib(json_backend):
+    set_json_backend("orjson")
+    assert json_loads("[NaN, 123456789012345678901234567890]")[1] == 123456789012345678901234567890
+
+
+def test_json_loads_invalid(json_backend):
+    set_json_backend("orjson")
+    with pytest.raises(ValueError):
+        json_loads("{not json")
+
+
+def test_set_json_backend_unknown(json_backend):
+    with pytest.raises(ScrapbookException):
+        set_json_backend("simplejson")
+
+
+def test_set_json_backend_unavailable(json_backend):
+    with mock.patch.object(utils, "orjson", None):
+        with pytest.raises(ScrapbookException):
+            set_json_backend("orjson")
+
+
+@pytest.mark.parametrize("size", [0, 1, 2, 3, 4, 5, 6, 100, 1000])
+@pytest.mark.parametrize("chunk_size", [3, 12, 3 * 2 ** 20])
+def test_b64_chunked_round_trip(size, chunk_size):
+    data = bytes(range(256)) * 4
+    data = data[:size]
+    encoded = b64encode_chunked(memoryview(data), chunk_size)
+    assert encoded == base64.b64encode(data)
+    assert b64decode_chunked(encoded.decode(), chunk_size // 3 * 4) == data
+
+
+def test_b64_decode_chunked_whitespace():
+    encoded = base64.encodebytes(b"x" * 200).decode()
+    assert "\n" in encoded
+    assert b64decode_chunked(encoded, 8) == b"x" * 200
+
+
+def test_b64_decode_chunked_invalid():
+    with pytest.raises(binascii.Error):
+        b64decode_chunked("abcde")
@@ -5,10 +5,27 @@ utils.py
 Provides the utilities for scrapbook functions and operations.
 """
 import sys
+import json
+import base64
+import binascii
 import warnings
 from functools import wraps
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 
 from .version import version as sb_version
+from .exceptions import ScrapbookException
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+EXECUTORS = {"thread": ThreadPoolExecutor, "process": ProcessPoolExecutor}
+# Bytes base64 encoded per chunk, a multiple of 3 so chunks need no padding
+B64_CHUNK_SIZE = 3 * 2 ** 20
+JSON_BACKENDS = ("orjson", "json")
+# Prefer the fastest available backend for parsing notebooks and payloads
+json_backend = "orjson" if orjson is not None else "json"
 
 
 def deprecated(version, replacement=None):
@@ -65,3 +82,104 @@ def kernel_required(f):
         return f(*args, **kwds)
 
     return wrapper
+
+
+def concurrent_map(func, items, workers=None, executor="thread"):
+    """
+    Returns a list of `func` applied to each item, preserving the item order.
+
+    Parameters
+    ----------
+    func : callable
+        The function to apply. Must be picklable for the "process" executor.
+    items : iterable
+        The items to apply `func` to.
+    workers : int (optional)
+        Number of concurrent workers. Items are processed serially by default.
+    executor : str (default: "thread")
+        Either "thread" or "process" to select the pool the workers run in.
+    """
+    if executor not in EXECUTORS:
+        raise ScrapbookException(
+            "Unknown executor '{}', expected one of {}".format(executor, sorted(EXECUTORS))
+        )
+    items = list(items)
+    if not workers or workers <= 1 or len(items) <= 1:
+        return [func(item) for item in items]
+
+    kwargs = {}
+    if executor == "process":
+        # Batch items to amortize inter-process overhead on large collections
+        kwargs["chunksize"] = max(1, len(items) // (workers * 4))
+    with EXECUTORS[executor](max_workers=workers) as pool:
+        return list(pool.map(func, items, **kwargs))
+
+
+def set_json_backend(name):
+    """
+    Selects the library used by `json_loads`, either "orjson" or "json" (stdlib).
+    """
+    global json_backend
+    if name not in JSON_BACKENDS:
+        raise ScrapbookException(
+            "Unknown JSON backend '{}', expected one of {}".format(name, JSON_BACKENDS)
+        )
+    if name == "orjson" and orjson is None:
+        raise ScrapbookException("The 'orjson' JSON backend requires orjson to be installed")
+    json_backend = name
+
+
+def json_loads(text):
+    """
+    Parses JSON text (str or bytes) with the selected JSON backend. Text that
+    orjson rejects is handed to the stdlib parser, which accepts a few more
+    inputs (NaN, Infinity, arbitrarily large integers) and raises the usual
+    `json.JSONDecodeError` on invalid JSON.
+    """
+    if json_backend == "orjson":
+        try:
+            return orjson.loads(text)
+        except orjson.JSONDecodeError:
+            pass
+    return json.loads(text)
+
+
+def b64encode_chunked(buffer, chunk_size=B64_CHUNK_SIZE):
+    """
+    Base64 encodes a bytes-like `buffer`, encoding chunks of a memoryview into
+    one preallocated output rather than copying the whole buffer around.
+    `chunk_size` must be a multiple of 3.
+
+    Returns the encoded ASCII as a bytearray, so callers can release `buffer`
+    before decoding it to the str stored in payloads.
+    """
+    view = memoryview(buffer).cast("B")
+    encoded = bytearray((len(view) + 2) // 3 * 4)
+    for start in range(0, len(view), chunk_size):
+        chunk = binascii.b2a_base64(view[start : start + chunk_size], newline=False)
+        offset = start // 3 * 4
+        encoded[offset : offset + len(chunk)] = chunk
+    return encoded
+
+
+def b64decode_chunked(data, chunk_size=B64_CHUNK_SIZE // 3 * 4):
+    """
+    Base64 decodes a str into a bytearray, decoding it chunk by chunk into one
+    preallocated output. Input that doesn't decode cleanly per chunk (such as
+    text with embedded whitespace) is handed to `base64.b64decode` as a whole.
+    """
+    padding = data[-2:].count("=")
+    decoded = bytearray(len(data) // 4 * 3 - padding)
+    position = 0
+    try:
+        if len(data) % 4:
+            raise binascii.Error("Incomplete base64 quantum")
+        for start in range(0, len(data), chunk_size):
+            chunk = binascii.a2b_base64(data[start : start + chunk_size])
+            decoded[position : position + len(chunk)] = chunk
+            position += len(chunk)
+    except (binascii.Error, ValueError):
+        position = None
+    if position != len(decoded):
+        return bytearray(base64.b64decode(data))
+    return decoded
@@ -34,7 +34,9 @@ def read_reqs(fname):
 reqs_s3 = ["papermill[s3]"]
 reqs_azure = ["papermill[azure]"]
 reqs_gcs = ["papermill[gcs]"]
-reqs_all = ["papermill[all]"]
+reqs_streaming = ["ijson>=3.1"]
+reqs_fast = ["orjson"]
+reqs_all = ["papermill[all]"] + reqs_streaming + reqs_fast
 reqs_dev = read_reqs("requirements-dev.txt")
 extras_require = {
     "test": reqs_dev,
@@ -43,6 +45,8 @@ extras_require = {
     "s3": reqs_s3,
     "azure": reqs_azure,
     "gcs": reqs_gcs,
+    "streaming": reqs_streaming,
+    "fast": reqs_fast,
 }
 
 # Get the long description from the README file